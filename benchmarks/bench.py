@@ -0,0 +1,289 @@
+"""Benchmarks of the overhead of nekontrol itself.
+
+    python benchmarks/bench.py             compare with the stored baselines
+    python benchmarks/bench.py --update    store the results as new baselines
+    python benchmarks/bench.py -k diff     only run benchmarks matching "diff"
+
+Times are stored relative to a calibration loop run on the same machine, so
+that baselines measured on one machine can be checked on another, such as
+in CI. A CPU bound benchmark that is more than the threshold slower than its
+baseline is a regression, and makes the script exit with status 1. The
+others, dominated by starting processes and I/O, don't scale with the
+calibration loop and are only reported.
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from os import path
+from typing import Callable
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+BASELINE_PATH = path.join(path.dirname(path.abspath(__file__)), "baseline.json")
+
+sys.path.insert(0, path.join(ROOT, "src"))
+
+# Keep the caches the benchmarks write out of the user's cache directory
+_cache_dir = tempfile.mkdtemp(prefix="nk-bench-cache-")
+os.environ["XDG_CACHE_HOME"] = _cache_dir
+
+from rich.console import Console  # noqa: E402
+
+from nekontrol import compare, language  # noqa: E402
+from nekontrol.config import Config  # noqa: E402
+from nekontrol.interactive.commands import run  # noqa: E402
+from nekontrol.problems.cache import CacheEntry, SampleStore  # noqa: E402
+from nekontrol.problems.sample import ProblemSample  # noqa: E402
+from nekontrol.problems.source import CachedProblemSource, Fetched  # noqa: E402
+from nekontrol.problems.sources.local import find_local_sources  # noqa: E402
+
+
+@dataclass
+class Benchmark:
+    name: str
+    setup: Callable[[str], Callable[[], object]]
+    """Prepares the benchmark in a temporary directory, returns the function
+    to time"""
+    number: int
+    """Calls of the function per measurement"""
+    cpu_bound: bool
+    """Only CPU bound benchmarks fail the run when they are slower than their
+    baseline, the others are only reported"""
+
+
+BENCHMARKS: list[Benchmark] = []
+
+
+def benchmark(number: int = 1, cpu_bound: bool = False):
+    def register(setup: Callable[[str], Callable[[], object]]):
+        BENCHMARKS.append(Benchmark(setup.__name__, setup, number, cpu_bound))
+        return setup
+
+    return register
+
+
+@benchmark(number=1)
+def cli_startup(tmp: str) -> Callable[[], object]:
+    env = dict(os.environ, PYTHONPATH=path.join(ROOT, "src"))
+    cmdline = [
+        sys.executable,
+        "-c",
+        "from nekontrol.interactive.cli import cli; cli()",
+        "--help",
+    ]
+    return lambda: subprocess.run(cmdline, env=env, stdout=subprocess.DEVNULL)
+
+
+@benchmark(number=20)
+def generic_run(tmp: str) -> Callable[[], object]:
+    return lambda: language.generic_run(["true"], "")
+
+
+@benchmark(number=20)
+def run_sample(tmp: str) -> Callable[[], object]:
+    # cat prints the input, which is the expected output
+    runnable = language.Runnable(
+        lambda input, args: language.generic_run(["cat"], input)
+    )
+    sample = ProblemSample(name="1.in", source="Local", input="1\n", output="1\n")
+    config = Config(color=False)
+    c = Console(file=io.StringIO())
+    return lambda: run.run(sample.name, runnable, sample, config, c=c)
+
+
+_LARGE_OUTPUT = "".join(f"{i} {i * i}\n" for i in range(200_000))
+
+
+@benchmark(number=3, cpu_bound=True)
+def diff_matching(tmp: str) -> Callable[[], object]:
+    actual = _LARGE_OUTPUT
+    return lambda: compare.diff(_LARGE_OUTPUT, actual)
+
+
+@benchmark(number=3, cpu_bound=True)
+def diff_mismatching(tmp: str) -> Callable[[], object]:
+    # Differs in the middle, and then on every line
+    middle = len(_LARGE_OUTPUT) // 2
+    actual = _LARGE_OUTPUT[:middle] + _LARGE_OUTPUT[middle:].replace(" ", "  ")
+    return lambda: compare.diff(_LARGE_OUTPUT, actual)
+
+
+def _test_data(tmp: str) -> str:
+    for dir in ["problem/data/sample", "problem/data/secret"]:
+        os.makedirs(path.join(tmp, dir))
+        for i in range(1000):
+            for extension in [".in", ".ans"]:
+                with open(path.join(tmp, dir, f"{i}{extension}"), "w") as f:
+                    f.write(f"{i}\n")
+
+    for i in range(2000):
+        with open(path.join(tmp, f"other{i}.cpp"), "w") as f:
+            f.write("")
+
+    # Recently modified directories are not indexed
+    for root, _, _ in os.walk(tmp):
+        os.utime(root, (0, 0))
+
+    return tmp
+
+
+@benchmark(number=3)
+def find_local_sources_cold(tmp: str) -> Callable[[], object]:
+    source_dir = _test_data(tmp)
+    patterns = Config().sample_patterns
+
+    def find():
+        shutil.rmtree(path.join(_cache_dir, "nekontrol", "local"), ignore_errors=True)
+        return find_local_sources("problem", source_dir, "Local", patterns)
+
+    return find
+
+
+@benchmark(number=10)
+def find_local_sources_cached(tmp: str) -> Callable[[], object]:
+    source_dir = _test_data(tmp)
+    patterns = Config().sample_patterns
+    find_local_sources("problem", source_dir, "Local", patterns)
+    return lambda: find_local_sources("problem", source_dir, "Local", patterns)
+
+
+def _samples() -> list[ProblemSample]:
+    return [
+        ProblemSample(
+            name=f"{i}.in", source="Bench", input=_LARGE_OUTPUT[: 10_000 * (i + 1)]
+        )
+        for i in range(5)
+    ]
+
+
+@benchmark(number=10)
+def sample_store_put(tmp: str) -> Callable[[], object]:
+    store = SampleStore(path.join(tmp, "samples.sqlite3"), 64 * 1024 * 1024)
+    entry = CacheEntry(_samples(), time.time())
+    return lambda: store.put("Bench", "problem", entry)
+
+
+class _BenchSource(CachedProblemSource):
+    source_name = "Bench"
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+
+    def store(self, cfg: Config) -> SampleStore:
+        return SampleStore(self.db_path, cfg.sample_cache_size)
+
+    def fetch(self, *args, **kwargs) -> Fetched:
+        return Fetched(_samples())
+
+
+@benchmark(number=10)
+def cached_source_hit(tmp: str) -> Callable[[], object]:
+    source = _BenchSource(path.join(tmp, "samples.sqlite3"))
+    cfg = Config()
+    source.find_problem("problem", tmp, cfg)
+    return lambda: source.find_problem("problem", tmp, cfg)
+
+
+def calibrate() -> float:
+    """The time of a fixed amount of pure Python work on this machine."""
+
+    def work():
+        total = 0
+        for i in range(200_000):
+            total += i * i % 7
+        return total
+
+    return min(_time(work, 1) for _ in range(7))
+
+
+def _time(f: Callable[[], object], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        f()
+    return (time.perf_counter() - start) / number
+
+
+def measure(bench: Benchmark, repeat: int) -> float:
+    """The fastest time per call of a benchmark, in seconds."""
+    with tempfile.TemporaryDirectory(prefix="nk-bench-") as tmp:
+        f = bench.setup(tmp)
+        f()  # Warm up
+        return min(_time(f, bench.number) for _ in range(repeat))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", help="Only run benchmarks with this in the name")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.0,
+        help="Fraction slower than the baseline that counts as a regression",
+    )
+    parser.add_argument(
+        "--update", action="store_true", help="Store the results as baselines"
+    )
+    args = parser.parse_args()
+
+    try:
+        with open(BASELINE_PATH) as f:
+            baselines: dict[str, float] = json.load(f)["benchmarks"]
+    except FileNotFoundError:
+        baselines = {}
+
+    unit = statistics.median(calibrate() for _ in range(3))
+    print(f"calibration: {unit * 1000:.2f} ms")
+
+    results: dict[str, float] = {}
+    regressions = []
+    for bench in BENCHMARKS:
+        if args.k is not None and args.k not in bench.name:
+            continue
+
+        seconds = measure(bench, args.repeat)
+        relative = seconds / unit
+        results[bench.name] = relative
+
+        line = f"{bench.name:28} {seconds * 1000:10.3f} ms {relative:10.3f} units"
+        baseline = baselines.get(bench.name)
+        if baseline is not None:
+            change = relative / baseline - 1
+            line += f" {change:+8.1%}"
+            if change > args.threshold:
+                if bench.cpu_bound:
+                    line += "  REGRESSION"
+                    regressions.append(bench.name)
+                else:
+                    line += "  slower (not checked)"
+        print(line)
+
+    shutil.rmtree(_cache_dir, ignore_errors=True)
+
+    if args.update:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(
+                {"calibration": unit, "benchmarks": baselines | results},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+        return 0
+
+    if regressions:
+        print(f"Slower than the baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import collections
+import contextlib
+import functools
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+from os import path
+from typing import Iterator, Union
+
+import appdirs
+
+
+@dataclass
+class CachedBinary:
+    path: str
+
+
+@dataclass
+class CachedError:
+    exit: int
+    stderr: str
+
+
+CacheEntry = Union[CachedBinary, CachedError]
+
+# Entries in use by this process, which eviction must not remove, by path
+_pinned: collections.Counter[str] = collections.Counter()
+_pinned_lock = threading.Lock()
+
+
+class BinaryCache:
+    """A content-addressed cache of compiled binaries and compile errors.
+
+    Entries are keyed by a hash chosen by the caller and evicted in least
+    recently used order once the cache grows larger than max_size bytes. An
+    entry is a file, or a directory such as a precompiled header.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    @staticmethod
+    def default_dir() -> str:
+        return path.join(appdirs.user_cache_dir("nekontrol"), "binaries")
+
+    def _binary_path(self, key: str) -> str:
+        return path.join(self.cache_dir, key)
+
+    def entry_path(self, key: str) -> str:
+        """Where the file or directory of an entry is stored."""
+        return self._binary_path(key)
+
+    @contextlib.contextmanager
+    def pinned(self, keys: list[str]) -> Iterator[None]:
+        """Keep the entries from being evicted by this process until the block
+        exits, such as objects that are about to be linked."""
+        paths = [self._binary_path(key) for key in keys]
+        with _pinned_lock:
+            _pinned.update(paths)
+        try:
+            yield
+        finally:
+            with _pinned_lock:
+                _pinned.subtract(paths)
+                for pinned_path in paths:
+                    if _pinned[pinned_path] <= 0:
+                        del _pinned[pinned_path]
+
+    def _error_path(self, key: str) -> str:
+        return path.join(self.cache_dir, f"{key}.err.json")
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        binary_path = self._binary_path(key)
+        error_path = self._error_path(key)
+
+        if path.exists(binary_path):
+            _touch(binary_path)
+            return CachedBinary(binary_path)
+
+        if path.exists(error_path):
+            _touch(error_path)
+            with open(error_path) as f:
+                j = json.load(f)
+            return CachedError(exit=j["exit"], stderr=j["stderr"])
+
+        return None
+
+    def new_output_path(self) -> str:
+        """A fresh path in the cache directory to compile to.
+
+        Compiling next to the cache entries makes store_binary an atomic rename.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, output_path = tempfile.mkstemp(prefix="tmp-", dir=self.cache_dir)
+        os.close(fd)
+        os.remove(output_path)
+        return output_path
+
+    def store_binary(self, key: str, binary_path: str) -> str:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cached_path = self._binary_path(key)
+        try:
+            os.replace(binary_path, cached_path)
+        except OSError:
+            shutil.move(binary_path, cached_path)
+        self.evict()
+        return cached_path
+
+    def store_error(self, key: str, exit: int, stderr: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix="tmp-", dir=self.cache_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"exit": exit, "stderr": stderr}, f)
+        os.replace(tmp_path, self._error_path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits."""
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.startswith("tmp-"):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    size = _dir_size(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    size = entry.stat().st_size
+                else:
+                    continue
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total += size
+
+        with _pinned_lock:
+            pinned = set(_pinned)
+
+        entries.sort()
+        for _, size, entry_path in entries:
+            if total <= self.max_size:
+                break
+            if entry_path in pinned:
+                continue
+            try:
+                if path.isdir(entry_path):
+                    shutil.rmtree(entry_path)
+                else:
+                    os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def _dir_size(dir: str) -> int:
+    size = 0
+    for root, _, files in os.walk(dir):
+        for file in files:
+            try:
+                size += os.stat(path.join(root, file)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _touch(file_path: str):
+    try:
+        os.utime(file_path)
+    except OSError:
+        pass
+
+
+@functools.cache
+def compiler_version(compiler: str) -> str:
+    """The resolved path and version string of a compiler."""
+    resolved = shutil.which(compiler) or compiler
+    try:
+        p = subprocess.run(
+            [resolved, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            stdin=subprocess.DEVNULL,
+            check=False,
+        )
+        version = p.stdout.decode("utf-8", errors="replace")
+    except OSError:
+        version = ""
+    return f"{resolved}\n{version}"
+
+
+def hash_file(h: "hashlib._Hash", file_path: str):
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+
+
+def hash_dir(h: "hashlib._Hash", dir: str):
+    """Hash the relative paths and contents of all files in a directory."""
+    for root, dirs, files in os.walk(dir):
+        dirs.sort()
+        for file in sorted(files):
+            file_path = path.join(root, file)
+            h.update(path.relpath(file_path, dir).encode("utf-8") + b"\0")
+            hash_file(h, file_path)
+            h.update(b"\0")
@@ -0,0 +1,127 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from .config import Config
+
+_token = re.compile(r"\S+")
+_debug_line = re.compile(r"\s*(?:dbg|debug)\b")
+_inline_debug = re.compile(r"\s*\((?:dbg|debug)\b[^)]*\)")
+
+
+@dataclass(frozen=True)
+class TokenChecker:
+    """Compares outputs token by token, like the default Kattis validator.
+
+    Whitespace only separates tokens, so its amount and kind doesn't matter.
+    If a tolerance is given, tokens in the expected output that are numbers
+    accept any number within either the absolute or the relative tolerance.
+    """
+
+    case_sensitive: bool = True
+    float_absolute_tolerance: float | None = None
+    float_relative_tolerance: float | None = None
+
+    @staticmethod
+    def from_config(config: Config) -> "TokenChecker":
+        return TokenChecker(
+            case_sensitive=config.case_sensitive,
+            float_absolute_tolerance=config.float_absolute_tolerance,
+            float_relative_tolerance=config.float_relative_tolerance,
+        )
+
+    @property
+    def has_tolerance(self) -> bool:
+        return (
+            self.float_absolute_tolerance is not None
+            or self.float_relative_tolerance is not None
+        )
+
+    def check(self, expected: Iterable[str], actual: Iterable[str]) -> str | None:
+        """Check the lines of the actual output against the expected output.
+
+        Returns:
+            None if the output is accepted, otherwise a description of the
+            first difference.
+        """
+        actual_tokens = tokens(actual)
+
+        for line, e in tokens(expected):
+            a = next(actual_tokens, None)
+
+            if a is None:
+                return f"Output ended early, expected {e!r} from line {line}"
+
+            if not self.token_matches(e, a[1]):
+                return f"Expected {e!r} on line {line}, got {a[1]!r} on line {a[0]}"
+
+        extra = next(actual_tokens, None)
+        if extra is not None:
+            return f"Unexpected output {extra[1]!r} on line {extra[0]}"
+
+        return None
+
+    def token_matches(self, expected: str, actual: str) -> bool:
+        if self.has_tolerance:
+            expected_float = _parse_float(expected)
+
+            if expected_float is not None:
+                actual_float = _parse_float(actual)
+                return actual_float is not None and self.float_matches(
+                    expected_float, actual_float
+                )
+
+        if self.case_sensitive:
+            return expected == actual
+        else:
+            return expected.casefold() == actual.casefold()
+
+    def float_matches(self, expected: float, actual: float) -> bool:
+        if math.isnan(expected) or math.isnan(actual):
+            return math.isnan(expected) and math.isnan(actual)
+
+        error = abs(expected - actual)
+        return (
+            self.float_absolute_tolerance is not None
+            and error <= self.float_absolute_tolerance
+        ) or (
+            self.float_relative_tolerance is not None
+            and error <= self.float_relative_tolerance * abs(expected)
+        )
+
+
+class DebugFilter:
+    """Removes debug output, lines whose first word is dbg or debug, and if
+    inline is set (dbg ...) or (debug ...) messages within lines."""
+
+    def __init__(self, inline: bool = False):
+        self.inline = inline
+        self.debug_lines = 0
+        """The number of lines that had debug output removed from them"""
+
+    def filter(self, lines: Iterable[str]) -> Iterator[str]:
+        for line in lines:
+            if _debug_line.match(line):
+                self.debug_lines += 1
+                continue
+
+            if self.inline:
+                line, n = _inline_debug.subn("", line)
+                if n:
+                    self.debug_lines += 1
+            yield line
+
+
+def tokens(lines: Iterable[str]) -> Iterator[tuple[int, str]]:
+    """The whitespace separated tokens of some lines, with their line numbers."""
+    for i, line in enumerate(lines, start=1):
+        for match in _token.finditer(line):
+            yield i, match.group()
+
+
+def _parse_float(token: str) -> float | None:
+    try:
+        return float(token)
+    except ValueError:
+        return None
@@ -1,7 +1,16 @@
+import collections
 import difflib
+import io
+import itertools
+from typing import Iterable, Iterator
 
 from rich.markup import escape
 
+CONTEXT_LINES = 3
+"""Matching lines shown before the first difference"""
+MAX_DIFF_LINES = 50
+"""Lines of each output that are diffed from the first difference and on"""
+
 
 def rich_diff_line(line: str) -> str:
     prefix, rest = line[:2], line[2:]
@@ -14,20 +23,70 @@ def rich_diff_line(line: str) -> str:
             return escape(line)
 
 
-def diff(expected: str, actual: str) -> str | None:
-    differ = difflib.Differ()
+def lines(output: str | Iterable[str]) -> Iterator[str]:
+    """The lines of an output without trailing whitespace, produced lazily."""
+    if isinstance(output, str):
+        output = io.StringIO(output, newline=None)
+    return (line.rstrip() for line in output)
+
+
+def diff(
+    expected: str | Iterable[str],
+    actual: str | Iterable[str],
+    context: int = CONTEXT_LINES,
+    max_lines: int = MAX_DIFF_LINES,
+) -> str | None:
+    """Diff two outputs, line by line ignoring trailing whitespace.
+
+    The outputs are streamed until the first difference, only a window of
+    max_lines from there on is diffed and shown. Files can be passed as the
+    outputs to avoid reading them into memory.
+
+    Returns:
+        None if the outputs are equal, otherwise the diff as rich markup.
+    """
+    expected_lines, actual_lines = lines(expected), lines(actual)
+
+    before: collections.deque[str] = collections.deque(maxlen=context)
+    matching = 0
+
+    for e, a in itertools.zip_longest(expected_lines, actual_lines):
+        if e == a:
+            before.append(e)
+            matching += 1
+            continue
 
-    is_diff = False
+        expected_window = _window(e, expected_lines, max_lines)
+        actual_window = _window(a, actual_lines, max_lines)
+        break
+    else:
+        return None
 
     rich_diff_lines = []
-    for line in differ.compare(
-        [line.rstrip() for line in expected.splitlines()],
-        [line.rstrip() for line in actual.splitlines()],
-    ):
-        if not line[:2] == "  ":
-            is_diff = True
 
+    if matching > len(before):
+        skipped = matching - len(before)
+        rich_diff_lines.append(
+            f"[bright_black]... {skipped} matching lines[/bright_black]"
+        )
+    rich_diff_lines += ["  " + escape(line) for line in before]
+
+    for line in difflib.Differ().compare(expected_window, actual_window):
         rich_diff_lines.append(rich_diff_line(line))
 
-    if is_diff:
-        return "\n".join(rich_diff_lines)
+    if _has_more(expected_lines) or _has_more(actual_lines):
+        rich_diff_lines.append(
+            "[bright_black]... rest of the output not shown[/bright_black]"
+        )
+
+    return "\n".join(rich_diff_lines)
+
+
+def _window(first: str | None, rest: Iterator[str], max_lines: int) -> list[str]:
+    if first is None:
+        return []
+    return [first] + list(itertools.islice(rest, max_lines - 1))
+
+
+def _has_more(it: Iterator[str]) -> bool:
+    return next(it, None) is not None
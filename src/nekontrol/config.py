@@ -1,12 +1,16 @@
+import os
 import os.path as path
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 
 
 @dataclass
 class Config:
     cpp_libs_dir: str | None = None
+    # A header to precompile for C++, such as "bits/stdc++.h"
+    cpp_pch: str | None = None
+    # Extra compiler flags by the Kattis name of the language, such as "C++"
     extra_flags: dict[str, list[str]] | None = None
     kattis_username: str | None = None
     kattis_token: str | None = None
@@ -14,7 +18,70 @@ class Config:
     diff: bool = True
     force: bool = False
     ignore_debug: bool = True
+    # Also remove inline (dbg ...) and (debug ...) messages within lines of
+    # output, when ignoring debug output
+    ignore_inline_debug: bool = False
+    # Compare tokens case sensitively
+    case_sensitive: bool = True
+    # Accept numbers within these tolerances of the expected numbers
+    float_absolute_tolerance: float | None = None
+    float_relative_tolerance: float | None = None
+    # Source of a program that validates output instead of comparing it to the
+    # answer, as an output validator in the Kattis problem package format
+    output_validator: str | None = None
     verbose: bool = False
+    # Globs for local inputs relative to the directory of the solution, where
+    # {problem} is the problem name and ** matches any number of directories.
+    # The answer of an input is the file with the same name ending in .ans.
+    # Patterns without {problem}, such as "data/**/*.in", find the same inputs
+    # for every solution in the directory
+    sample_patterns: list[str] = field(
+        default_factory=lambda: ["{problem}*.in", "{problem}/**/*.in"]
+    )
+    # Seconds to wait for samples from each source, such as Kattis
+    fetch_timeout: float = 10.0
+    # Seconds before cached samples are checked for changes
+    sample_cache_ttl: float = 7 * 24 * 60 * 60
+    # Seconds before fetching samples is tried again after it failed
+    sample_cache_failure_ttl: float = 10 * 60
+    # Size in bytes of compressed samples above which the least recently used
+    # problems are removed from the cache
+    sample_cache_size: int = 64 * 1024 * 1024
+    # Number of samples to run in parallel, 0 for one per CPU core
+    jobs: int = 1
+    # Run samples one at a time so measured durations aren't skewed by load
+    precise_timing: bool = False
+    # Run each sample this many times, and report statistics of the durations
+    repeat: int = 1
+    # Untimed runs of each sample before the timed ones, to warm up caches
+    warmup: int = 0
+    # CPU to run solutions on, one sample at a time, so that they aren't moved
+    # between CPUs or run next to each other. Linux only
+    pin_cpu: int | None = None
+    # Reuse compiled binaries (and compile errors) for unchanged sources
+    binary_cache: bool = True
+    # Size in bytes above which the least recently used binaries are removed
+    binary_cache_size: int = 512 * 1024 * 1024
+    # Connect input files directly to stdin and spool stdout to disk, for
+    # test data that is too large to keep in memory
+    file_io: bool = False
+    # Run Python solutions by forking an interpreter that has already started
+    # and imported the modules the solution uses, instead of starting a new
+    # one for every sample. Only Python, other interpreters can't fork
+    warm_workers: bool = False
+    # Wall clock time limit in seconds for each run
+    time_limit: float | None = None
+    # CPU time limit in seconds for each run
+    cpu_limit: float | None = None
+    # Address space limit in MiB for each run. Runtimes that reserve large
+    # amounts of virtual memory up front (GHC, Node) may need a generous limit
+    memory_limit: int | None = None
+
+    def worker_count(self) -> int:
+        """The number of samples to run at the same time."""
+        if self.precise_timing or self.pin_cpu is not None:
+            return 1
+        return self.jobs or os.cpu_count() or 1
 
 
 def find_config(dir: str) -> str | None:
@@ -0,0 +1,214 @@
+"""Prebuilt objects for cpp_libs_dir and precompiled headers for C++."""
+
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from os import path
+
+from .binary_cache import (
+    BinaryCache,
+    CachedBinary,
+    CachedError,
+    compiler_version,
+    hash_file,
+)
+
+CPP_SOURCE_EXTENSIONS = {".cc", ".cpp", ".cxx"}
+
+
+def find_lib_sources(libs_dir: str) -> list[str]:
+    cpp_sources = []
+    for root, _, files in os.walk(libs_dir):
+        for file in files:
+            _, ext = path.splitext(file)
+            if ext in CPP_SOURCE_EXTENSIONS:
+                cpp_sources.append(path.join(root, file))
+    return sorted(cpp_sources)
+
+
+def _headers_digest(libs_dir: str) -> str:
+    """Hash every non-source file in libs_dir, any of them may be included."""
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(libs_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if path.splitext(file)[1] in CPP_SOURCE_EXTENSIONS:
+                continue
+            file_path = path.join(root, file)
+            h.update(path.relpath(file_path, libs_dir).encode("utf-8") + b"\0")
+            hash_file(h, file_path)
+    return h.hexdigest()
+
+
+def _object_key(
+    compiler: str, flags: list[str], source: str, headers_digest: str
+) -> str:
+    h = hashlib.sha256()
+    h.update(compiler_version(compiler).encode("utf-8"))
+    h.update(json.dumps(flags).encode("utf-8"))
+    h.update(headers_digest.encode("utf-8"))
+    hash_file(h, source)
+    return h.hexdigest() + ".o"
+
+
+def _compile_object(
+    cache: BinaryCache, key: str, compiler: str, flags: list[str], source: str
+) -> str | CachedError:
+    output = cache.new_output_path()
+    p = subprocess.Popen(
+        [compiler, *flags, "-c", source, "-o", output],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    _, stderr = p.communicate()
+
+    if p.returncode != 0:
+        if path.exists(output):
+            os.remove(output)
+        err = stderr.decode("utf-8")
+        cache.store_error(key, p.returncode, err)
+        return CachedError(exit=p.returncode, stderr=err)
+
+    return cache.store_binary(key, output)
+
+
+def build_lib_objects(
+    cache: BinaryCache,
+    compiler: str,
+    flags: list[str],
+    libs_dir: str,
+    pins: contextlib.ExitStack | None = None,
+) -> list[str] | CachedError:
+    """Compile the sources in libs_dir to object files.
+
+    Objects are stored in the binary cache keyed by their source, the headers
+    in libs_dir, the flags and the compiler, so only sources whose contents
+    changed since the last build are recompiled. If pins is given, the objects
+    are kept from being evicted until it is closed, so that they can be
+    linked.
+
+    Returns:
+        The object files, or the first compile error.
+    """
+    sources = find_lib_sources(libs_dir)
+    headers_digest = _headers_digest(libs_dir)
+
+    keys = [_object_key(compiler, flags, source, headers_digest) for source in sources]
+    if pins is not None:
+        pins.enter_context(cache.pinned(keys))
+
+    objects: list[str | CachedError | None] = []
+    missing: list[tuple[int, str, str]] = []
+
+    for i, (source, key) in enumerate(zip(sources, keys)):
+        match cache.lookup(key):
+            case CachedBinary(path=object_path):
+                objects.append(object_path)
+            case CachedError() as err:
+                objects.append(err)
+            case None:
+                objects.append(None)
+                missing.append((i, key, source))
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+            futures = [
+                (i, pool.submit(_compile_object, cache, key, compiler, flags, source))
+                for i, key, source in missing
+            ]
+            for i, future in futures:
+                objects[i] = future.result()
+
+    result = []
+    for obj in objects:
+        if isinstance(obj, CachedError):
+            return obj
+        assert obj is not None
+        result.append(obj)
+    return result
+
+
+def is_gcc(compiler: str) -> bool:
+    return "Free Software Foundation" in compiler_version(compiler)
+
+
+def build_pch(
+    cache: BinaryCache,
+    compiler: str,
+    flags: list[str],
+    header: str,
+    pins: contextlib.ExitStack | None = None,
+) -> str | None:
+    """Precompile a header such as bits/stdc++.h.
+
+    The header is precompiled inside a directory that shadows the original
+    header, passing that directory with -I makes GCC pick up the precompiled
+    version. Only GCC finds precompiled headers like this, and only uses them
+    when they were built with the same flags as the source, so flags must be
+    those of the compile.
+
+    The directory is an entry of the binary cache, kept from being evicted
+    until pins is closed if given.
+
+    Returns:
+        The directory to include, or None if the header couldn't be
+        precompiled.
+    """
+    if not is_gcc(compiler):
+        return None
+
+    h = hashlib.sha256()
+    h.update(compiler_version(compiler).encode("utf-8"))
+    h.update(json.dumps(flags).encode("utf-8"))
+    h.update(header.encode("utf-8"))
+    key = h.hexdigest() + ".pch"
+    if pins is not None:
+        pins.enter_context(cache.pinned([key]))
+
+    pch_dir = cache.entry_path(key)
+    failed_marker = pch_dir + ".failed"
+
+    if path.exists(pch_dir):
+        try:
+            os.utime(pch_dir)
+        except OSError:
+            pass
+        return pch_dir
+    if path.exists(failed_marker):
+        return None
+
+    os.makedirs(cache.cache_dir, exist_ok=True)
+    build_dir = tempfile.mkdtemp(prefix="tmp-", dir=cache.cache_dir)
+    try:
+        wrapper = path.join(build_dir, header)
+        os.makedirs(path.dirname(wrapper), exist_ok=True)
+        with open(wrapper, "w") as f:
+            # Only read if the precompiled header can't be used
+            f.write(f"#include_next <{header}>\n")
+
+        p = subprocess.run(
+            [compiler, *flags, "-x", "c++-header", wrapper, "-o", wrapper + ".gch"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=False,
+        )
+        if p.returncode != 0:
+            open(failed_marker, "w").close()
+            return None
+
+        try:
+            os.rename(build_dir, pch_dir)
+        except OSError:
+            # Built by someone else in the meantime
+            pass
+    finally:
+        if path.exists(build_dir):
+            shutil.rmtree(build_dir)
+
+    cache.evict()
+    return pch_dir
@@ -0,0 +1,142 @@
+"""A warm Python interpreter that forks a fresh process for every run.
+
+Run by the interpreter of the solution as `fork_server.py SOURCE`, so it must
+not import nekontrol and should work on any Python 3 (and PyPy). It imports
+the top level imports of the solution once, and then reads one JSON request
+per line from stdin:
+
+    {"stdin": path, "stdout": path, "stderr": path, "args": [...],
+     "cpu_limit": seconds or null, "memory_limit": bytes or null,
+     "cpu": the CPU to pin the child to or null}
+
+For each request it forks a child that runs the solution as __main__ with
+the files as its standard streams. It writes {"ready": true} to stdout once
+the imports are done, and then two JSON lines for every request:
+{"pid": pid} once the child has started, and {"exit": code, "utime": ...,
+"stime": ..., "maxrss": ..., "server_maxrss": ...} once it has finished, with
+the resource usage of the child and the peak memory of the server itself.
+"""
+
+import ast
+import json
+import os
+import resource
+import runpy
+import sys
+import traceback
+
+
+def preload_imports(source):
+    """Import what the solution imports at the top level, ignoring failures."""
+    try:
+        with open(source, "rb") as f:
+            tree = ast.parse(f.read())
+    except (OSError, SyntaxError, ValueError):
+        return
+
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names = [node.module]
+        else:
+            continue
+
+        for name in names:
+            try:
+                __import__(name)
+            except BaseException:
+                pass
+
+
+def run_child(source, request):
+    for fd, key, flags in [
+        (0, "stdin", os.O_RDONLY),
+        (1, "stdout", os.O_WRONLY),
+        (2, "stderr", os.O_WRONLY),
+    ]:
+        file_fd = os.open(request[key], flags)
+        os.dup2(file_fd, fd)
+        os.close(file_fd)
+
+    if request.get("cpu_limit") is not None:
+        seconds = request["cpu_limit"]
+        resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+    if request.get("memory_limit") is not None:
+        memory = request["memory_limit"]
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+    if request.get("cpu") is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {request["cpu"]})
+
+    sys.stdin = open(0, "r", closefd=False)
+    sys.stdout = open(1, "w", closefd=False)
+    sys.stderr = open(2, "w", closefd=False, buffering=1)
+    sys.argv = [source] + request.get("args", [])
+
+    code = 0
+    try:
+        runpy.run_path(source, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        code = code or 1
+    os._exit(code)
+
+
+def respond(obj):
+    os.write(1, (json.dumps(obj) + "\n").encode("utf-8"))
+
+
+def main():
+    source = sys.argv[1]
+    sys.path[0] = os.path.dirname(os.path.abspath(source))
+    preload_imports(source)
+    respond({"ready": True})
+
+    control = os.fdopen(os.dup(0), "rb", buffering=0)
+    while True:
+        line = control.readline()
+        if not line:
+            return
+
+        request = json.loads(line)
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+        pid = os.fork()
+        if pid == 0:
+            control.close()
+            run_child(source, request)
+
+        respond({"pid": pid})
+        _, status, usage = os.wait4(pid, 0)
+        if os.WIFSIGNALED(status):
+            exit_code = -os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+        respond(
+            {
+                "exit": exit_code,
+                "utime": usage.ru_utime,
+                "stime": usage.ru_stime,
+                "maxrss": usage.ru_maxrss,
+                "server_maxrss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            }
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import importlib.metadata
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+def _version() -> str:
+    try:
+        return importlib.metadata.version("nekontrol")
+    except importlib.metadata.PackageNotFoundError:
+        # Run from a source checkout that isn't installed
+        return "dev"
+
+
+USER_AGENT = f"nekontrol/{_version()}"
+
+_session: requests.Session | None = None
+_lock = threading.Lock()
+
+
+def session() -> requests.Session:
+    """A shared session, so connections to Kattis are kept alive and reused.
+
+    Idempotent requests that fail to connect or get a temporary error are
+    retried with exponential backoff. Once the retries run out, the last
+    response is returned like any other response that isn't ok.
+    """
+    global _session
+
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET", "HEAD"],
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(max_retries=retry, pool_maxsize=16)
+
+            _session = requests.Session()
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers["User-Agent"] = USER_AGENT
+
+        return _session
@@ -1,10 +1,10 @@
+import os
+
 import click
 
 from nekontrol.config import Config, exec_config
 from nekontrol.console import setup_console
 
-from . import commands
-
 executable_file = click.Path(
     exists=True, readable=True, file_okay=True, dir_okay=False, resolve_path=True
 )
@@ -17,25 +17,166 @@ def config_parser(path_argument: str):
         @click.option(
             "--ignore-debug/--no-ignore-debug",
             default=None,
-            help="Ignore lines starting with `debug`",
+            help="Ignore lines starting with `dbg` or `debug`",
+        )
+        @click.option(
+            "--ignore-inline-debug/--no-ignore-inline-debug",
+            default=None,
+            help="Also ignore `(dbg ...)` and `(debug ...)` within lines",
+        )
+        @click.option(
+            "--case-sensitive/--case-insensitive",
+            default=None,
+            help="Compare output case sensitively",
+        )
+        @click.option(
+            "--float-tolerance",
+            type=click.FloatRange(min=0),
+            default=None,
+            help="Accept numbers within this absolute or relative error",
+        )
+        @click.option(
+            "--float-absolute-tolerance",
+            type=click.FloatRange(min=0),
+            default=None,
+            help="Accept numbers within this absolute error",
+        )
+        @click.option(
+            "--float-relative-tolerance",
+            type=click.FloatRange(min=0),
+            default=None,
+            help="Accept numbers within this relative error",
+        )
+        @click.option(
+            "--validator",
+            "output_validator",
+            type=executable_file,
+            default=None,
+            help="Validate output with a Kattis style output validator program",
         )
         @click.option(
             "--force/--no-force",
             default=None,
             help="Submit even if sample verification fails",
         )
+        @click.option(
+            "-j",
+            "--jobs",
+            type=click.IntRange(min=0),
+            is_flag=False,
+            flag_value=0,
+            default=None,
+            help="Run samples in parallel, 0 or no value for one per CPU core",
+        )
+        @click.option(
+            "--precise-timing/--no-precise-timing",
+            default=None,
+            help="Run samples one at a time for more accurate durations",
+        )
+        @click.option(
+            "--repeat",
+            type=click.IntRange(min=1),
+            default=None,
+            metavar="N",
+            help="Run each sample N times and show statistics of the durations",
+        )
+        @click.option(
+            "--warmup",
+            type=click.IntRange(min=0),
+            default=None,
+            metavar="K",
+            help="Run each sample K times before timing it",
+        )
+        @click.option(
+            "--pin-cpu",
+            type=click.IntRange(min=0),
+            default=None,
+            metavar="CPU",
+            help="Run solutions on this CPU only, one sample at a time",
+        )
+        @click.option(
+            "--file-io/--no-file-io",
+            default=None,
+            help="Read input from and write output to files instead of memory",
+        )
+        @click.option(
+            "--warm/--no-warm",
+            "warm_workers",
+            default=None,
+            help="Fork Python solutions from an already started interpreter",
+        )
+        @click.option(
+            "--time-limit",
+            type=click.FloatRange(min=0, min_open=True),
+            default=None,
+            metavar="SECONDS",
+            help="Kill runs after this many seconds of wall clock time",
+        )
+        @click.option(
+            "--cpu-limit",
+            type=click.FloatRange(min=0, min_open=True),
+            default=None,
+            metavar="SECONDS",
+            help="Kill runs after this many seconds of CPU time",
+        )
+        @click.option(
+            "--memory-limit",
+            type=click.IntRange(min=1),
+            default=None,
+            metavar="MIB",
+            help="Limit the address space of runs to this many MiB",
+        )
         @click.pass_context
         def wrapper(
             ctx: click.Context,
             *args,
             **kwargs,
         ):
-            config = exec_config(kwargs[path_argument])
-            for opt in ["diff", "ignore_debug", "verbose", "force"]:
+            paths = kwargs[path_argument]
+            # With several files, the configuration of the first one is used
+            config = exec_config(paths[0] if isinstance(paths, tuple) else paths)
+
+            # Like the Kattis validator, sets both tolerances
+            float_tolerance = kwargs.pop("float_tolerance")
+            if float_tolerance is not None:
+                config.float_absolute_tolerance = float_tolerance
+                config.float_relative_tolerance = float_tolerance
+
+            for opt in [
+                "diff",
+                "ignore_debug",
+                "ignore_inline_debug",
+                "case_sensitive",
+                "float_absolute_tolerance",
+                "float_relative_tolerance",
+                "output_validator",
+                "verbose",
+                "force",
+                "jobs",
+                "precise_timing",
+                "repeat",
+                "warmup",
+                "pin_cpu",
+                "file_io",
+                "warm_workers",
+                "time_limit",
+                "cpu_limit",
+                "memory_limit",
+            ]:
                 v = kwargs.pop(opt)
                 if v is not None:
                     assert hasattr(config, opt), f"{config} {opt}"
                     config.__setattr__(opt, v)
+
+            if config.pin_cpu is not None:
+                if not hasattr(os, "sched_getaffinity"):
+                    raise click.UsageError("--pin-cpu is only supported on Linux")
+                if config.pin_cpu not in os.sched_getaffinity(0):
+                    raise click.UsageError(
+                        f"Can't run on CPU {config.pin_cpu}, the available CPUs are "
+                        + ", ".join(map(str, sorted(os.sched_getaffinity(0))))
+                    )
+
             return ctx.invoke(f, *args, config=config, **kwargs)
 
         return wrapper
@@ -61,16 +202,163 @@ def test(
     """Run and test against sample and local test data."""
     setup_console()
 
-    commands.test.test(file_path, problem, config)
+    from .commands import test
 
+    test.test(file_path, problem, config)
 
-@cli.command("submit", context_settings={"help_option_names": ["-h", "--help"]})
+
+@cli.command("watch", context_settings={"help_option_names": ["-h", "--help"]})
 @click.argument("file-path", metavar="FILE", type=executable_file)
 @click.option("-p", "--problem", type=str, help="The kattis problem name")
-@click.option("-y", "--yes", is_flag=True)
 @config_parser("file_path")
-def submit(config: Config, file_path: str, problem: str | None, yes: bool):
-    """Submit a solution to Kattis."""
+def watch(
+    config: Config,
+    file_path: str,
+    problem: str | None,
+):
+    """Test again whenever the solution or test data changes."""
     setup_console()
 
-    commands.submit.submit(file_path, problem, config, yes)
+    from .commands import watch
+
+    watch.watch(file_path, problem, config)
+
+
+@cli.command("stress", context_settings={"help_option_names": ["-h", "--help"]})
+@click.argument("file-path", metavar="FILE", type=executable_file)
+@click.option(
+    "--gen",
+    "generator_path",
+    type=executable_file,
+    required=True,
+    help="A program that prints a random input, given a seed as its argument",
+)
+@click.option(
+    "--ref",
+    "reference_path",
+    type=executable_file,
+    required=True,
+    help="A correct, possibly slow, solution to compare with",
+)
+@click.option(
+    "-n", "--count", type=click.IntRange(min=1), help="Stop after this many cases"
+)
+@click.option("--seed", type=int, help="The seed of the first case, random by default")
+@config_parser("file_path")
+def stress(
+    config: Config,
+    file_path: str,
+    generator_path: str,
+    reference_path: str,
+    count: int | None,
+    seed: int | None,
+):
+    """Compare with a reference solution on generated inputs.
+
+    Cases are run on all cores until the outputs differ, then the input and
+    the output of the reference are saved as local test data.
+    """
+    setup_console()
+
+    from .commands import stress
+
+    stress.stress(file_path, generator_path, reference_path, config, count, seed)
+
+
+@cli.command("profile", context_settings={"help_option_names": ["-h", "--help"]})
+@click.argument("file-path", metavar="FILE", type=executable_file)
+@click.option("-p", "--problem", type=str, help="The kattis problem name")
+@click.option(
+    "-s",
+    "--sample",
+    "sample_name",
+    type=str,
+    help="The sample to profile, such as test.1.in, the slowest by default",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=15,
+    show_default=True,
+    help="The number of hotspots to show",
+)
+@config_parser("file_path")
+def profile(
+    config: Config,
+    file_path: str,
+    problem: str | None,
+    sample_name: str | None,
+    top: int,
+):
+    """Profile a solution on its slowest sample.
+
+    Uses cProfile for Python, perf for C++ and Rust, GHC profiling for
+    Haskell and --cpu-prof for Node.
+    """
+    setup_console()
+
+    from .commands import profile
+
+    profile.profile(file_path, problem, sample_name, top, config)
+
+
+@cli.command("prefetch", context_settings={"help_option_names": ["-h", "--help"]})
+@click.argument("problems", metavar="PROBLEM|FILE|DIR...", nargs=-1, required=True)
+@click.option(
+    "-c",
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    show_default=True,
+    help="The number of problems to download at the same time",
+)
+@click.option("-f", "--force", is_flag=True, help="Download cached problems again")
+@click.option("--verbose/--no-verbose", default=None, help="Verbose output")
+def prefetch(
+    problems: tuple[str, ...], concurrency: int, force: bool, verbose: bool | None
+):
+    """Download samples for problems to the cache.
+
+    Problems are given by id, by a file with one id per line, or by a
+    directory where the names of the solutions are the ids.
+    """
+    setup_console()
+
+    config = exec_config(".")
+    if verbose is not None:
+        config.verbose = verbose
+
+    from .commands import prefetch
+
+    prefetch.prefetch(list(problems), config, concurrency, force)
+
+
+@cli.command("submit", context_settings={"help_option_names": ["-h", "--help"]})
+@click.argument(
+    "file-paths", metavar="FILE...", type=executable_file, nargs=-1, required=True
+)
+@click.option("-p", "--problem", type=str, help="The kattis problem name")
+@click.option("-y", "--yes", is_flag=True)
+@config_parser("file_paths")
+def submit(config: Config, file_paths: tuple[str, ...], problem: str | None, yes: bool):
+    """Submit solutions to Kattis.
+
+    Several solutions are tested at the same time, then submitted together
+    and their judging is followed in one display.
+    """
+    setup_console()
+
+    from .commands import submit
+
+    submit.submit(list(file_paths), problem, config, yes)
+
+
+@cli.command("track", context_settings={"help_option_names": ["-h", "--help"]})
+@click.argument("submission-ids", metavar="SUBMISSION_ID...", nargs=-1, required=True)
+def track(submission_ids: tuple[str, ...]):
+    """Follow the judging of earlier submissions to Kattis."""
+    setup_console()
+
+    from .commands import submit
+
+    submit.track(list(submission_ids), exec_config("."))
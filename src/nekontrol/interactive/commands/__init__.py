@@ -1,3 +1,5 @@
-from . import run as run  # type: ignore # noqa
-from . import submit as submit  # type: ignore # noqa
-from . import test as test  # type: ignore # noqa
+"""The commands of the CLI.
+
+They are not imported here, each command is imported by the CLI only when it
+is run, so that startup doesn't pay for the dependencies of all commands.
+"""
@@ -0,0 +1,77 @@
+import os
+import os.path as path
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from rich.console import Console
+
+from nekontrol import language
+from nekontrol.config import Config
+from nekontrol.problems.sources.kattis import KattisSource
+
+from ..tasks import Task, TaskContext
+
+
+def problem_ids(args: list[str]) -> list[str]:
+    """Find the problem ids of the arguments of prefetch.
+
+    An argument is either a directory, where the names of all solutions are
+    problem ids, a file with one problem id per line, or a problem id.
+    """
+    ids: list[str] = []
+
+    for arg in args:
+        if path.isdir(arg):
+            for entry in os.scandir(arg):
+                name, ext = path.splitext(entry.name)
+                if entry.is_file() and ext in language.languages:
+                    ids.append(name)
+        elif path.isfile(arg):
+            with open(arg) as f:
+                for line in f:
+                    line = line.split("#", 1)[0].strip()
+                    if line:
+                        ids.append(line)
+        else:
+            ids.append(arg)
+
+    # Remove duplicates but keep the order
+    return list(dict.fromkeys(ids))
+
+
+def prefetch(args: list[str], config: Config, concurrency: int, force: bool):
+    c = Console()
+    source = KattisSource()
+
+    ids = problem_ids(args)
+    if not ids:
+        raise click.ClickException("Found no problems to fetch")
+
+    fetch_ids = [id for id in ids if force or not source.is_fresh(id, config)]
+    if config.verbose and len(fetch_ids) < len(ids):
+        c.print(f"[bright_black]{len(ids) - len(fetch_ids)} problems already cached")
+
+    def fetch(id: str, task: Task) -> bool:
+        try:
+            samples = source.update_cache(id, "", config, revalidate=not force)
+        except Exception as e:
+            task.fail(f"{id}: {e.__class__.__name__}")
+            return False
+
+        if samples:
+            task.ok(f"{id}: {len(samples)} samples")
+            return True
+        else:
+            task.fail(f"{id}: No samples")
+            return False
+
+    with TaskContext(console=c) as tctx:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(fetch, id, tctx.add_task(f"{id}: Fetching"))
+                for id in fetch_ids
+            ]
+            results = [future.result() for future in futures]
+
+    if not all(results):
+        exit(1)
@@ -0,0 +1,145 @@
+import dataclasses
+import os.path as path
+
+import click
+from rich.console import Console
+from rich.markup import escape
+from rich.table import Table
+
+from nekontrol import language, problems
+from nekontrol.config import Config
+from nekontrol.language import FileInput, Runnable
+from nekontrol.problems.sample import ProblemSample
+from nekontrol.problems.sources.kattis import KattisSource
+from nekontrol.problems.sources.local import LocalSource
+from nekontrol.profiler import Hotspot, profilers
+
+from ..tasks import TaskContext
+
+
+def slowest_sample(
+    runnable: Runnable, samples: list[ProblemSample], config: Config, tctx: TaskContext
+) -> ProblemSample:
+    """Run every sample once, and return the one that took the longest."""
+    durations = []
+    for sample in samples:
+        task = tctx.add_task(f"Timing {sample.name}")
+        result = runnable.run(sample_input(sample, config))
+        result.cleanup()
+
+        duration = result.wall_time or 0.0
+        task.finish(f"Timing {sample.name} ⏱  {duration:.3} s")
+        durations.append(duration)
+
+    return max(zip(samples, durations), key=lambda sd: sd[1])[0]
+
+
+def sample_input(sample: ProblemSample, config: Config) -> str | FileInput:
+    if config.file_io and sample.input_path is not None:
+        return FileInput(sample.input_path)
+    return sample.input
+
+
+def hotspot_table(hotspots: list[Hotspot], top: int) -> Table:
+    has_total = any(h.total_fraction is not None for h in hotspots)
+
+    table = Table(box=None)
+    table.add_column("#", justify="right", style="bright_black")
+    table.add_column("Self", justify="right")
+    if has_total:
+        table.add_column("Total", justify="right")
+    table.add_column("Function")
+    table.add_column("Location", style="bright_black")
+
+    for i, hotspot in enumerate(hotspots[:top], start=1):
+        row = [str(i), f"{hotspot.self_fraction:.1%}"]
+        if has_total:
+            row.append(
+                f"{hotspot.total_fraction:.1%}"
+                if hotspot.total_fraction is not None
+                else ""
+            )
+        row += [escape(hotspot.name), escape(hotspot.location or "")]
+        table.add_row(*row)
+
+    return table
+
+
+def profile(
+    file_path: str,
+    problem: str | None,
+    sample_name: str | None,
+    top: int,
+    config: Config,
+):
+    file_path = path.abspath(file_path)
+    file_name = path.basename(file_path)
+    file_dir = path.dirname(file_path)
+    file_base, extension = path.splitext(file_name)
+
+    c = Console()
+
+    if problem is None:
+        problem = file_base
+
+    lang_class = language.languages.get(extension)
+    profiler = profilers.get(lang_class) if lang_class is not None else None
+    if lang_class is None or profiler is None:
+        raise click.ClickException(
+            f"Profiling files with extension {extension} is not implemented."
+        )
+
+    # Build with the flags of the profiler, such as symbols for perf, and run
+    # normally instead of from warm interpreters
+    extra_flags = dict(config.extra_flags or {})
+    extra_flags[lang_class.kattis_name] = (
+        extra_flags.get(lang_class.kattis_name, []) + profiler.flags
+    )
+    config = dataclasses.replace(config, extra_flags=extra_flags, warm_workers=False)
+
+    with TaskContext(console=c) as tctx:
+        # Local files are matched by the file name, Kattis by the problem
+        samples = problems.problem_samples(
+            file_base, file_dir, config, tctx=tctx, sources=[LocalSource()]
+        ) + problems.problem_samples(
+            problem, file_dir, config, tctx=tctx, sources=[KattisSource()]
+        )
+
+        lang = lang_class(file_path, config, tctx=tctx)
+        with lang as runnable:
+            if sample_name is not None:
+                named = [sample for sample in samples if sample.name == sample_name]
+                if not named:
+                    raise click.ClickException(
+                        f"Found no sample named {sample_name}, the samples are "
+                        + ", ".join(sample.name for sample in samples)
+                    )
+                sample = named[0]
+            elif samples:
+                sample = slowest_sample(runnable, samples, config, tctx)
+            else:
+                raise click.ClickException(
+                    f"Found no inputs to run for problem {problem}"
+                )
+
+            task = tctx.add_task(f"Profiling {sample.name} with {profiler.name}")
+            try:
+                result = profiler.profile(lang, sample_input(sample, config))
+            except click.ClickException:
+                task.fail()
+                raise
+            result.result.cleanup()
+
+            if result.result.exit == 0:
+                task.ok()
+            else:
+                task.fail(
+                    f"Profiling {sample.name} with {profiler.name},"
+                    f" exited with code {result.result.exit}"
+                )
+
+    if not result.hotspots:
+        c.print("[yellow]The profile has no samples, the run may be too short")
+        return
+
+    c.print(hotspot_table(result.hotspots, top))
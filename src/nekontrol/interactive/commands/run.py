@@ -1,30 +1,153 @@
+import io
+import statistics
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
 
 from rich.console import Console
 from rich.markup import escape
 
 from nekontrol import compare, util
+from nekontrol.checker import DebugFilter, TokenChecker
 from nekontrol.config import Config
-from nekontrol.interactive.tasks import TaskContext
-from nekontrol.language import Runnable
+from nekontrol.interactive.tasks import Task, TaskContext
+from nekontrol.language import FileInput, Runnable, RunResult
 from nekontrol.problems.sample import ProblemSample
+from nekontrol.validator import OutputValidator, Validation
 
 
-def run(
-    name: str,
+@dataclass
+class Execution:
+    """A finished run of a sample that has not been reported yet."""
+
+    sample: ProblemSample
+    result: RunResult
+    duration: float
+    task: Task | None
+    task_msg: str
+    validation: Validation | None = None
+    wall_times: list[float] = field(default_factory=list)
+    """The durations of every timed run, when the sample is repeated"""
+    cpu_times: list[float] = field(default_factory=list)
+
+
+def execute(
     runnable: Runnable,
     sample: ProblemSample,
     config: Config,
     tctx: TaskContext | None = None,
-    c: Console = Console(),
-) -> bool:
+    validator: OutputValidator | None = None,
+) -> Execution:
+    """Run a sample, and validate its output, without printing anything.
+
+    Safe to call from worker threads, the results are printed with report.
+    """
     task_msg = f"Testing with {sample.name}"
     task = tctx.add_task(task_msg) if tctx else None
 
-    start = time.time()
-    result = runnable.run(sample.input)
-    finish = time.time()
-    duration = finish - start
+    # Only read the input now, so that only samples being run are in memory
+    input: str | FileInput
+    if config.file_io and sample.input_path is not None:
+        input = FileInput(sample.input_path)
+    else:
+        input = sample.input
+
+    for _ in range(config.warmup):
+        runnable.run(input).cleanup()
+
+    result, duration = _timed_run(runnable, input)
+
+    # Only the first run is checked, the others are only timed, and only if it
+    # finished normally
+    wall_times: list[float] = []
+    cpu_times: list[float] = []
+    if config.repeat > 1 and result.limit_exceeded is None and result.exit == 0:
+        wall_times.append(duration)
+        if result.cpu_time is not None:
+            cpu_times.append(result.cpu_time)
+
+        for _ in range(config.repeat - 1):
+            repeated, repeated_duration = _timed_run(runnable, input)
+            repeated.cleanup()
+            wall_times.append(repeated_duration)
+            if repeated.cpu_time is not None:
+                cpu_times.append(repeated.cpu_time)
+
+        duration = statistics.median(wall_times)
+
+    validation = None
+    if validator is not None and sample.has_output and result.limit_exceeded is None:
+        validation = validator.validate(sample, result)
+
+    return Execution(
+        sample=sample,
+        result=result,
+        duration=duration,
+        task=task,
+        task_msg=task_msg,
+        validation=validation,
+        wall_times=wall_times,
+        cpu_times=cpu_times,
+    )
+
+
+def _timed_run(runnable: Runnable, input: str | FileInput) -> tuple[RunResult, float]:
+    start = time.perf_counter()
+    result = runnable.run(input)
+    finish = time.perf_counter()
+    duration = result.wall_time if result.wall_time is not None else finish - start
+    return result, duration
+
+
+def timing_stats_msg(name: str, times: list[float]) -> str:
+    """Format the statistics of the durations of repeated runs."""
+    stdev = statistics.stdev(times) if len(times) > 1 else 0.0
+    return (
+        f"{name} min {min(times):.3} s, median {statistics.median(times):.3} s,"
+        f" mean {statistics.mean(times):.3} s, stdev {stdev:.2} s"
+    )
+
+
+def usage_msg(result: RunResult) -> str:
+    """Format the CPU time and peak memory of a run, if they were measured."""
+    parts = []
+    if result.cpu_time is not None:
+        parts.append(f"cpu {result.cpu_time:.3} s")
+    if result.max_rss is not None:
+        bound = "≤ " if result.max_rss_upper_bound else ""
+        parts.append(f"mem {bound}{result.max_rss / 1024 / 1024:.1f} MiB")
+
+    if not parts:
+        return ""
+    return " [bright_black]" + ", ".join(parts) + "[/bright_black]"
+
+
+def report(execution: Execution, config: Config, c: Console = Console()) -> bool:
+    """Print the result of an execution, returns False if it failed."""
+    try:
+        return _report(execution, config, c)
+    finally:
+        execution.result.cleanup()
+
+
+def _expected_lines(sample: ProblemSample) -> Iterator[str]:
+    if sample.output_path is not None:
+        with open(sample.output_path, "r", encoding="utf-8", errors="replace") as f:
+            yield from f
+    else:
+        output = sample.output
+        assert output is not None
+        yield from io.StringIO(output)
+
+
+def _report(execution: Execution, config: Config, c: Console) -> bool:
+    sample, result, duration, task = (
+        execution.sample,
+        execution.result,
+        execution.duration,
+        execution.task,
+    )
 
     bg = "black on bright_red"
     if duration < 1:
@@ -32,36 +155,86 @@ def run(
     elif duration < 3:
         bg = "black on bright_yellow"
 
-    time_msg = f"[{bg}] ⏱  {duration:.3} s [/{bg}]"
+    time_msg = f"[{bg}] ⏱  {duration:.3} s [/{bg}]" + usage_msg(result)
+
+    task_finished_msg = execution.task_msg + " " + time_msg
+    if execution.wall_times:
+        task_finished_msg += (
+            f"\n  [bright_black]{len(execution.wall_times)} runs, "
+            + timing_stats_msg("wall", execution.wall_times)
+        )
+        if execution.cpu_times:
+            task_finished_msg += "\n  " + timing_stats_msg("cpu", execution.cpu_times)
+        task_finished_msg += "[/bright_black]"
+
+    if result.limit_exceeded is not None:
+        if task:
+            task.fail(task_finished_msg)
+
+        c.print(f"[red]{result.limit_exceeded.value}")
+        c.print("Input:")
+        c.print(escape(util.indented(sample.input)))
+
+        if result.stderr:
+            c.print("[yellow]Got stderr:")
+            c.print(escape(util.indented(result.stderr)))
 
-    task_finished_msg = task_msg + " " + time_msg
+        return False
 
-    if config.diff and sample.output is not None:
-        diff = compare.diff(sample.output, result.stdout)
+    if execution.validation is not None:
+        validation = execution.validation
 
-        if diff:
+        if not validation.accepted:
             if task:
                 task.fail(task_finished_msg)
 
             c.print("Input:")
             c.print(escape(util.indented(sample.input)))
-            c.print("[yellow]Output:")
-            c.print(diff)
+            c.print("[yellow]Got output:")
+            c.print(escape(util.indented(result.read_stdout())))
+            c.print(f"[red]{escape(validation.feedback)}")
 
             return False
         else:
             if task:
                 task.ok(task_finished_msg)
 
-        if result.exit != 0:
-            c.print(
-                f"[red]Proccess exited with a non-zero exit code {result.exit}"
-                + (" and the following stderr:" if result.stderr else "")
+        if validation.feedback:
+            c.print(escape(util.indented(validation.feedback)))
+
+        if not _exited_cleanly(result, validation.debug_lines, c):
+            return False
+    elif config.diff and sample.has_output:
+        debug_filter = DebugFilter(inline=config.ignore_inline_debug)
+
+        def actual_lines(lines: Iterable[str]) -> Iterable[str]:
+            return debug_filter.filter(lines) if config.ignore_debug else lines
+
+        with result.open_stdout() as actual:
+            error = TokenChecker.from_config(config).check(
+                _expected_lines(sample), actual_lines(actual)
             )
 
-            if result.stderr:
-                c.print(escape(util.indented(result.stderr)))
+        if error is not None:
+            if task:
+                task.fail(task_finished_msg)
+
+            with result.open_stdout() as actual:
+                diff = compare.diff(_expected_lines(sample), actual_lines(actual))
+
+            c.print("Input:")
+            c.print(escape(util.indented(sample.input)))
+            c.print("[yellow]Output:")
+            if diff is not None:
+                c.print(diff)
+            c.print(f"[red]{escape(error)}")
+
+            return False
+        else:
+            if task:
+                task.ok(task_finished_msg)
 
+        if not _exited_cleanly(result, debug_filter.debug_lines, c):
             return False
     else:
         if task:
@@ -70,10 +243,114 @@ def run(
         c.print("[yellow]Input:")
         c.print(escape(util.indented(sample.input)))
         c.print("[yellow]Got output:")
-        c.print(escape(util.indented(result.stdout)))
+        c.print(escape(util.indented(result.read_stdout())))
 
     if result.stderr:
         c.print("[yellow]Got stderr:")
         c.print(escape(util.indented(result.stderr)))
 
     return True
+
+
+def _exited_cleanly(result: RunResult, debug_lines: int, c: Console) -> bool:
+    """Print warnings for an accepted output, returns False if the run failed."""
+    if debug_lines:
+        c.print(
+            f"[yellow]Ignored debug output on {debug_lines} lines,"
+            " remove it before submitting"
+        )
+
+    if result.exit != 0:
+        c.print(
+            f"[red]Proccess exited with a non-zero exit code {result.exit}"
+            + (" and the following stderr:" if result.stderr else "")
+        )
+
+        if result.stderr:
+            c.print(escape(util.indented(result.stderr)))
+
+        return False
+
+    return True
+
+
+def run(
+    name: str,
+    runnable: Runnable,
+    sample: ProblemSample,
+    config: Config,
+    tctx: TaskContext | None = None,
+    c: Console = Console(),
+    validator: OutputValidator | None = None,
+) -> bool:
+    return report(
+        execute(runnable, sample, config, tctx=tctx, validator=validator), config, c=c
+    )
+
+
+def run_samples(
+    runnable: Runnable,
+    samples: list[ProblemSample],
+    config: Config,
+    tctx: TaskContext | None = None,
+    c: Console = Console(),
+    validator: OutputValidator | None = None,
+) -> bool:
+    """Run and report all samples, returns False if any of them failed."""
+    return all(
+        run_each_sample(runnable, samples, config, tctx=tctx, c=c, validator=validator)
+    )
+
+
+def run_each_sample(
+    runnable: Runnable,
+    samples: list[ProblemSample],
+    config: Config,
+    tctx: TaskContext | None = None,
+    c: Console = Console(),
+    validator: OutputValidator | None = None,
+) -> list[bool]:
+    """Run and report all samples, returns if each of them succeeded.
+
+    Samples are run, and validated by the validator if given, by
+    config.worker_count() workers, but the results are always reported in
+    the order of samples.
+    """
+    workers = config.worker_count()
+
+    if workers == 1 or len(samples) <= 1:
+        results = [
+            report(
+                execute(runnable, sample, config, tctx=tctx, validator=validator),
+                config,
+                c=c,
+            )
+            for sample in samples
+        ]
+        return results
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    futures = []
+    # Reported executions clean up after themselves
+    reported = 0
+    try:
+        futures = [
+            pool.submit(
+                execute, runnable, sample, config, tctx=tctx, validator=validator
+            )
+            for sample in samples
+        ]
+        results = []
+        for future in futures:
+            execution = future.result()
+            reported += 1
+            results.append(report(execution, config, c=c))
+    finally:
+        pool.shutdown(cancel_futures=True)
+
+        # If reporting failed, clean up the runs that finished anyway
+        for future in futures[reported:]:
+            if not future.cancelled() and future.exception() is None:
+                future.result().result.cleanup()
+
+    return results
@@ -0,0 +1,246 @@
+import concurrent.futures
+import contextlib
+import dataclasses
+import io
+import itertools
+import os
+import os.path as path
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import click
+from rich.console import Console
+from rich.markup import escape
+
+from nekontrol import language, util
+from nekontrol.checker import DebugFilter, TokenChecker
+from nekontrol.config import Config
+from nekontrol.language import Runnable, RunResult
+from nekontrol.problems.sample import ProblemSample
+
+from ..tasks import Task, TaskContext
+from . import run
+
+
+@dataclass
+class Mismatch:
+    """A generated input the solution gets wrong."""
+
+    seed: int
+    input: str
+    answer: str
+    """The output of the reference solution"""
+
+
+@dataclass
+class Stress:
+    """Runs generated inputs through a solution and a reference solution, by
+    several workers that each generate, run and compare cases."""
+
+    solution: Runnable
+    generator: Runnable
+    reference: Runnable
+    config: Config
+
+    def __post_init__(self):
+        self._checker = TokenChecker.from_config(self.config)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.cases = 0
+        """The number of cases that have been checked"""
+        self.mismatch: Mismatch | None = None
+
+    def search(
+        self, first_seed: int, count: int | None, workers: int, task: Task | None
+    ) -> Mismatch | None:
+        """Check cases with consecutive seeds until a mismatch is found, or
+        count cases have been checked. Returns the mismatch with the lowest
+        seed."""
+        seeds = itertools.count(first_seed)
+        end = first_seed + count if count is not None else None
+
+        def next_seed() -> int | None:
+            with self._lock:
+                seed = next(seeds)
+            return seed if end is None or seed < end else None
+
+        def work():
+            try:
+                while not self._stop.is_set() and (seed := next_seed()) is not None:
+                    mismatch = self.check(seed)
+                    with self._lock:
+                        self.cases += 1
+                        # Cases in progress are finished after stopping, so
+                        # this is the mismatch with the lowest seed
+                        if mismatch is not None and (
+                            self.mismatch is None or mismatch.seed < self.mismatch.seed
+                        ):
+                            self.mismatch = mismatch
+                            self._stop.set()
+            except BaseException:
+                self._stop.set()
+                raise
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(work) for _ in range(workers)]
+            try:
+                while concurrent.futures.wait(futures, timeout=0.25).not_done:
+                    if task is not None:
+                        rate = self.cases / (time.perf_counter() - start)
+                        task.msg = (
+                            f"Stress testing: {self.cases} cases, {rate:.0f} per second"
+                        )
+            finally:
+                self._stop.set()
+
+            for future in futures:
+                future.result()
+
+        return self.mismatch
+
+    def check(self, seed: int) -> Mismatch | None:
+        """Generate and check a case, returns it if the solution fails."""
+        input = self._output_of(
+            "Generator", self.generator.run("", [str(seed)]), seed, None
+        )
+        answer = self._output_of("Reference", self.reference.run(input), seed, input)
+
+        result = self.solution.run(input)
+        try:
+            if result.limit_exceeded is not None or result.exit != 0:
+                return Mismatch(seed, input, answer)
+
+            with result.open_stdout() as actual:
+                lines = (
+                    DebugFilter(inline=self.config.ignore_inline_debug).filter(actual)
+                    if self.config.ignore_debug
+                    else actual
+                )
+                if self._checker.check(io.StringIO(answer), lines) is not None:
+                    return Mismatch(seed, input, answer)
+        finally:
+            result.cleanup()
+
+        return None
+
+    def _output_of(
+        self, program: str, result: RunResult, seed: int, input: str | None
+    ) -> str:
+        try:
+            if result.limit_exceeded is not None or result.exit != 0:
+                msg = f"{program} failed with seed {seed}" + (
+                    f", exit code {result.exit}"
+                    if result.limit_exceeded is None
+                    else f", {result.limit_exceeded.value}"
+                )
+                if input is not None:
+                    msg += "\nInput:\n" + util.indented(input)
+                if result.stderr:
+                    msg += "\nStderr:\n" + util.indented(result.stderr)
+                raise click.ClickException(msg)
+
+            return result.read_stdout()
+        finally:
+            result.cleanup()
+
+
+def program_lang(
+    program_path: str, config: Config, tctx: TaskContext | None
+) -> language.Language:
+    lang = language.get_lang(program_path, config, tctx=tctx)
+
+    if lang is None:
+        _, extension = path.splitext(program_path)
+        raise click.ClickException(
+            f"Language for file extension {extension} is not implemented."
+        )
+
+    return lang
+
+
+def worker_count(config: Config) -> int:
+    """Cases are small and independent, so they are run on every core unless
+    asked not to, or timing must be precise or solutions are pinned to a
+    single CPU."""
+    if config.jobs != 1 or config.precise_timing or config.pin_cpu is not None:
+        return config.worker_count()
+    return os.cpu_count() or 1
+
+
+def save_case(file_path: str, mismatch: Mismatch) -> str:
+    """Save a case as local test data of the solution, returns the input path."""
+    base, _ = path.splitext(file_path)
+    for i in itertools.count(1):
+        input_path = f"{base}.stress{i}.in"
+        if not path.exists(input_path):
+            break
+
+    with open(input_path, "w") as f:
+        f.write(mismatch.input)
+    with open(input_path[: -len(".in")] + ".ans", "w") as f:
+        f.write(mismatch.answer)
+
+    return input_path
+
+
+def stress(
+    file_path: str,
+    generator_path: str,
+    reference_path: str,
+    config: Config,
+    count: int | None,
+    seed: int | None,
+):
+    c = Console()
+
+    if seed is None:
+        seed = random.randrange(2**31)
+
+    workers = worker_count(config)
+
+    # Python programs are forked from warm interpreters instead of being
+    # started for every case, and only the solution is limited
+    config = dataclasses.replace(config, warm_workers=True)
+    helper_config = dataclasses.replace(
+        config, time_limit=None, cpu_limit=None, memory_limit=None
+    )
+
+    with TaskContext(console=c) as tctx, contextlib.ExitStack() as stack:
+        solution = stack.enter_context(program_lang(file_path, config, tctx))
+        generator = stack.enter_context(
+            program_lang(generator_path, helper_config, tctx)
+        )
+        reference = stack.enter_context(
+            program_lang(reference_path, helper_config, tctx)
+        )
+
+        s = Stress(solution, generator, reference, config)
+        task = tctx.add_task("Stress testing")
+        try:
+            mismatch = s.search(seed, count, workers, task)
+        except KeyboardInterrupt:
+            task.finish(f"Stopped after {s.cases} cases")
+            return
+
+        if mismatch is None:
+            task.ok(f"No differences in {s.cases} cases, seeds {seed} and up")
+            return
+
+        task.fail(f"Found a difference with seed {mismatch.seed}")
+        input_path = save_case(file_path, mismatch)
+        c.print(f"Saved the case as {escape(path.relpath(input_path))}")
+
+        # Run it again as a sample, to report it like nk test
+        sample = ProblemSample.from_files(
+            name=path.basename(input_path),
+            source="Stress",
+            input_path=input_path,
+            output_path=input_path[: -len(".in")] + ".ans",
+        )
+        run.run(sample.name, solution, sample, config, tctx=tctx, c=c)
+
+    exit(1)
@@ -30,133 +30,298 @@
 #
 # KATTIS LICENSE ENDS
 
+import contextlib
+import hashlib
+import io
+import json
+import os
 import os.path as path
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import TypeAlias, assert_never
 
+import appdirs
 import click
 import requests
 import rich.prompt
 from lxml.html import fragment_fromstring
-from requests.sessions import RequestsCookieJar
+from rich.console import Console
 from rich.markup import escape
+from rich.text import Text
 
-from nekontrol import language
+from nekontrol import http_session, language
 from nekontrol.config import Config
 from nekontrol.console import get_console
 from nekontrol.interactive.tasks import Task, TaskContext
 
 from . import test
 
-_HEADERS = {"User-Agent": "nekontrol/0.2.5"}
+_KATTIS = "https://open.kattis.com"
 
 
-def login(user: str, token: str) -> RequestsCookieJar:
-    r = requests.post(
-        "https://open.kattis.com/login",
+def _cookies_path(user: str) -> str:
+    return path.join(appdirs.user_cache_dir("nekontrol"), f"kattis-{user}.json")
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _load_cookies(session: requests.Session, user: str, token: str) -> bool:
+    """Load the cookies of an earlier login with the same token."""
+    try:
+        with open(_cookies_path(user)) as f:
+            stored = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    if stored.get("token") != _token_digest(token):
+        return False
+
+    for cookie in stored["cookies"]:
+        session.cookies.set(**cookie)
+    return True
+
+
+def _store_cookies(session: requests.Session, user: str, token: str):
+    cookies = [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "expires": cookie.expires,
+            "secure": cookie.secure,
+        }
+        for cookie in session.cookies
+        if cookie.domain.endswith("kattis.com")
+    ]
+
+    cookies_path = _cookies_path(user)
+    os.makedirs(path.dirname(cookies_path), exist_ok=True)
+    tmp_path = f"{cookies_path}.{os.getpid()}.tmp"
+    # The cookies are as good as the token, so only the user may read them
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"token": _token_digest(token), "cookies": cookies}, f)
+    os.replace(tmp_path, cookies_path)
+
+
+def login(user: str, token: str) -> requests.Session:
+    """Log in to Kattis with the shared session, and store the cookies."""
+    session = http_session.session()
+    r = session.post(
+        f"{_KATTIS}/login",
         data={
             "user": user,
             "token": token,
             "script": "true",
         },
-        headers=_HEADERS,
     )
     if r.status_code != 200:
         raise click.ClickException(f"Failed to login ({r.status_code}): {r.text}")
-    return r.cookies
 
-
-def get_submission_id(response_text: str) -> str:
-    m = re.search(r"Submission ID: (\d+)", response_text)
-    if m is None:
-        raise click.ClickException(
-            f"Couldn't find submission ID in response: {response_text}."
-        )
-    return m.group(1)
+    _store_cookies(session, user, token)
+    return session
 
 
-def submit(file_path: str, problem: str | None, config: Config, yes: bool):
-    file_name = path.basename(file_path)
-    file_base, extension = path.splitext(file_name)
+def _rejected(r: requests.Response) -> bool:
+    """If a request was rejected because the session isn't logged in."""
+    return r.status_code in (401, 403) or r.url.startswith(f"{_KATTIS}/login")
 
-    c = get_console()
 
-    if problem is None:
-        if config.verbose:
-            c.print(
-                f"[yellow]No problem name specified, guessing '{escape(file_base)}'"
+@dataclass
+class KattisSession:
+    """A logged in session, which reuses the cookies of the last login until
+    Kattis rejects them."""
+
+    user: str
+    token: str
+    session: requests.Session
+
+    @staticmethod
+    def from_config(config: Config) -> "KattisSession":
+        if config.kattis_username is None:
+            raise click.ClickException(
+                # Align with clicks "Error: " prefix.
+                "Missing kattis username in configuration. Please go to\n"
+                # Error:
+                "       https://open.kattis.com/download/kattisrc and\n"
+                "       copy the username and token to your .nkconfig.py."
+            )
+        if config.kattis_token is None:
+            raise click.ClickException(
+                # Align with clicks "Error: " prefix.
+                "Missing kattis token in configuration. Please go to\n"
+                # Error:
+                "       https://open.kattis.com/download/kattisrc and\n"
+                "       copy the token to your .nkconfig.py."
             )
-        problem = file_base
 
-    lang = language.get_lang(file_path, config)
+        user, token = config.kattis_username, config.kattis_token
+        session = http_session.session()
+        if not _load_cookies(session, user, token):
+            session = login(user, token)
+        return KattisSession(user, token, session)
 
-    if lang is None:
-        raise click.ClickException(
-            f"Language for file extension {escape(extension)} is not implemented."
-        )
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        r = self.session.request(method, url, **kwargs)
+        if _rejected(r):
+            self.session.cookies.clear()
+            login(self.user, self.token)
+            r = self.session.request(method, url, **kwargs)
+        return r
 
-    # test before submitting
-    if not config.force:
-        test.test(file_path, problem, config)
 
-    if not (
-        yes
-        or rich.prompt.Confirm.ask("Are you sure you want to submit?", default=False)
-    ):
-        return
-
-    # login to kattis
-    if config.kattis_username is None:
-        raise click.ClickException(
-            # Align with clicks "Error: " prefix.
-            "Missing kattis username in configuration. Please go to\n"
-            # Error:
-            "       https://open.kattis.com/download/kattisrc and\n"
-            "       copy the username and token to your .nkconfig.py."
-        )
-    if config.kattis_token is None:
+def get_submission_id(response_text: str) -> str:
+    m = re.search(r"Submission ID: (\d+)", response_text)
+    if m is None:
         raise click.ClickException(
-            # Align with clicks "Error: " prefix.
-            "Missing kattis token in configuration. Please go to\n"
-            # Error:
-            "       https://open.kattis.com/download/kattisrc and\n"
-            "       copy the token to your .nkconfig.py."
+            f"Couldn't find submission ID in response: {response_text}."
         )
-    login_cookies = login(config.kattis_username, config.kattis_token)
+    return m.group(1)
 
+
+@dataclass
+class Solution:
+    file_path: str
+    problem: str
+    lang: language.Language
+
+
+def _pre_test(solution: Solution, config: Config, tctx: TaskContext) -> bool:
+    # Reports are written once the whole solution is tested, so that the
+    # reports of solutions tested at the same time aren't interleaved
+    buffer = Console(
+        file=io.StringIO(),
+        record=True,
+        force_terminal=tctx.console.is_terminal,
+        color_system=tctx.console.color_system,
+        width=tctx.console.width,
+    )
+    try:
+        return test.test_solution(
+            solution.file_path, solution.problem, config, tctx, buffer
+        )
+    except click.ClickException as e:
+        buffer.print(f"[red]{escape(e.message)}")
+        return False
+    except Exception as e:
+        # Such as failing to start the compiler or interpreter, which only
+        # fails this solution
+        buffer.print(f"[red]{escape(f'{e.__class__.__name__}: {e}')}")
+        return False
+    finally:
+        output = buffer.export_text(styles=True)
+        if output:
+            tctx.console.rule(escape(path.basename(solution.file_path)))
+            tctx.console.print(Text.from_ansi(output), end="")
+
+
+def _submit_solution(solution: Solution, kattis: KattisSession) -> str:
+    """Submit a solution, returns the submission id."""
     data = {
         "submit": "true",
         "submit_ctr": 2,
-        "language": lang.kattis_name,
+        "language": solution.lang.kattis_name,
         "mainclass": None,  # TODO: support java, scala, kotlin
-        "problem": problem,
+        "problem": solution.problem,
         "tag": None,  # TODO: what is this?
         "script": "true",
     }
 
-    with open(file_path) as file:
+    with open(solution.file_path) as file:
         files = [
             (
                 "sub_file[]",
-                (path.basename(file_path), file.read(), "application/octet-stream"),
+                (
+                    path.basename(solution.file_path),
+                    file.read(),
+                    "application/octet-stream",
+                ),
             )
         ]
 
-    r = requests.post(
-        "https://open.kattis.com/submit",
-        data=data,
-        files=files,
-        cookies=login_cookies,
-        headers=_HEADERS,
-    )
+    r = kattis.request("POST", f"{_KATTIS}/submit", data=data, files=files)
 
     if r.status_code != 200:
-        raise click.ClickException(f"Submission failed ({r.status_code}):\n{r.text}")
+        raise click.ClickException(
+            f"Submission of {solution.file_path} failed ({r.status_code}):\n{r.text}"
+        )
 
-    submission_id = get_submission_id(r.text)
-    live_poll_submission(submission_id, login_cookies)
+    return get_submission_id(r.text)
+
+
+def submit(file_paths: list[str], problem: str | None, config: Config, yes: bool):
+    c = get_console()
+
+    if problem is not None and len(file_paths) > 1:
+        raise click.UsageError("--problem can only be used with a single file.")
+
+    solutions = []
+    for file_path in file_paths:
+        file_name = path.basename(file_path)
+        file_base, extension = path.splitext(file_name)
+
+        if problem is None and config.verbose:
+            c.print(
+                f"[yellow]No problem name specified, guessing '{escape(file_base)}'"
+            )
+
+        lang = language.get_lang(file_path, config)
+
+        if lang is None:
+            raise click.ClickException(
+                f"Language for file extension {escape(extension)} is not implemented."
+            )
+
+        solutions.append(Solution(file_path, problem or file_base, lang))
+
+    # test before submitting, all solutions at the same time
+    if not config.force:
+        with TaskContext(console=c) as tctx:
+            with ThreadPoolExecutor(max_workers=len(solutions)) as pool:
+                passed = list(pool.map(lambda s: _pre_test(s, config, tctx), solutions))
+
+        failed = [s.file_path for s, ok in zip(solutions, passed) if not ok]
+        if failed:
+            c.print(
+                f"[red]Not submitting, tests failed for {escape(', '.join(failed))}"
+            )
+            exit(1)
+
+    question = (
+        "Are you sure you want to submit?"
+        if len(solutions) == 1
+        else f"Are you sure you want to submit {len(solutions)} solutions?"
+    )
+    if not (yes or rich.prompt.Confirm.ask(question, default=False)):
+        return
+
+    kattis = KattisSession.from_config(config)
+
+    # A failed submission doesn't stop the others from being submitted and
+    # tracked, the failures are reported at the end
+    errors = []
+    with TaskContext(console=c) as tctx:
+        submissions = {}
+        for solution in solutions:
+            try:
+                submissions[_submit_solution(solution, kattis)] = solution.problem
+            except click.ClickException as e:
+                errors.append(f"{solution.file_path}: {e.format_message()}")
+            except OSError as e:
+                errors.append(f"{solution.file_path}: {e}")
+
+        if submissions:
+            live_poll_submissions(submissions, kattis, tctx=tctx)
+
+    for error in errors:
+        c.print(f"[red]{escape(error)}")
+    if errors:
+        exit(1)
 
 
 STATUS_NEW = 0
@@ -200,6 +365,8 @@ def get_status_message(status: int) -> str:
 @dataclass
 class PollStatusPreparing:
     msg: str
+    # Waiting in the judge queue, rather than compiling
+    queued: bool = False
 
 
 @dataclass
@@ -229,13 +396,11 @@ class PollStatusErr:
 PollStatus: TypeAlias = "PollStatusPreparing | PollStatusPrepareErr | PollStatusRunning | PollStatusAccepted | PollStatusErr"  # noqa
 
 
-def poll(submission_id: str, login_cookies: RequestsCookieJar) -> PollStatus:
+def poll(submission_id: str, kattis: KattisSession) -> PollStatus:
     """Poll a submission status"""
 
-    submission_url = f"https://open.kattis.com/submissions/{submission_id}"
-    submission_response = requests.get(
-        submission_url + "?json", cookies=login_cookies, headers=_HEADERS
-    )
+    submission_url = f"{_KATTIS}/submissions/{submission_id}"
+    submission_response = kattis.request("GET", submission_url + "?json")
 
     if submission_response.status_code != 200:
         raise click.ClickException(
@@ -261,7 +426,10 @@ def poll(submission_id: str, login_cookies: RequestsCookieJar) -> PollStatus:
 
         return PollStatusPrepareErr(msg=msg)
     elif status_id < STATUS_RUNNING:
-        return PollStatusPreparing(f"{get_status_message(status_id)}")
+        return PollStatusPreparing(
+            f"{get_status_message(status_id)}",
+            queued=status_id != STATUS_COMPILING,
+        )
     elif status_id == STATUS_RUNNING:
         return PollStatusRunning(
             total_test_cases=testcases_total, successful_test_cases=testcases_done
@@ -286,73 +454,149 @@ def poll(submission_id: str, login_cookies: RequestsCookieJar) -> PollStatus:
         )
 
 
-def live_poll_submission(submission_id, login_cookies):
-    """Poll a submission's status until it isn't running."""
-
-    with TaskContext() as tctx:
-        prepare_task: Task = tctx.add_task("Preparing: New...")
-        running_task: Task | None = None
-
-        while True:
-            status = poll(submission_id, login_cookies)
-
-            check = r"[green]\[✓] [/green]"
-            cross = r"[red]\[✕] [/red]"
-            quest = r"[blue]\[?] [/blue]"
-
-            match status:
-                case PollStatusPreparing(msg=msg):
-                    prepare_task.msg = f"Preparing: {escape(msg)}..."
-                case PollStatusPrepareErr(msg=msg):
-                    prepare_task.fail(f"Preparing: {msg}")
-                    break
-                case PollStatusRunning(
-                    total_test_cases=total_test_cases,
-                    successful_test_cases=successful_test_cases,
-                ):
-                    prepare_task.ok("Preparing: Ok")
-
-                    rest = total_test_cases - successful_test_cases
-                    checks = check * successful_test_cases + quest * rest
-                    msg = f"Running: {checks}"
-
-                    if not running_task:
-                        running_task = tctx.add_task(msg)
-                    else:
-                        running_task.msg = msg
-                case PollStatusAccepted(total_test_cases=total_test_cases):
-                    prepare_task.ok("Preparing: Ok")
-
-                    msg = f"Running: {check * total_test_cases}"
-                    if running_task:
-                        running_task.ok(msg)
-                    else:
-                        running_task = tctx.add_task(msg)
-                        running_task.ok()
-                    break
-                case PollStatusErr(
-                    total_test_cases=total_test_cases,
-                    successful_test_cases=successful_test_cases,
-                    msg=status_err,
-                ):
-                    prepare_task.ok("Preparing: Ok")
-
-                    rest = total_test_cases - successful_test_cases - 1
-                    checks = check * successful_test_cases + cross + quest * rest
-                    msg = f"Running: {checks}"
-
-                    if running_task:
-                        running_task.fail(msg)
-                    else:
-                        running_task = tctx.add_task(msg)
-                        running_task.fail()
-                    c = tctx.console
-                    c.print(
+# Seconds between polls of a submission. Running submissions are polled
+# often to show progress, queued ones less and less often
+_RUNNING_INTERVAL = 0.25
+_COMPILING_INTERVAL = 0.5
+_QUEUED_INTERVAL = 0.5
+_MAX_QUEUED_INTERVAL = 3.0
+
+
+def next_poll_interval(status: PollStatus, interval: float) -> float:
+    """The seconds to wait before polling again, after waiting interval."""
+    match status:
+        case PollStatusPreparing(queued=True):
+            return min(max(interval * 1.5, _QUEUED_INTERVAL), _MAX_QUEUED_INTERVAL)
+        case PollStatusPreparing():
+            return _COMPILING_INTERVAL
+        case _:
+            return _RUNNING_INTERVAL
+
+
+class _TrackedSubmission:
+    """The tasks showing the status of a submission."""
+
+    def __init__(self, submission_id: str, label: str, tctx: TaskContext):
+        self.submission_id = submission_id
+        self.label = label
+        self.tctx = tctx
+        self.prepare_task: Task = tctx.add_task(self._msg("Preparing: New..."))
+        self.running_task: Task | None = None
+        self.status: PollStatus | None = None
+        self.interval = 0.0
+        self.next_poll = 0.0
+
+    def _msg(self, msg: str) -> str:
+        return f"{escape(self.label)}: {msg}"
+
+    def update(self, status: PollStatus) -> bool:
+        """Show a new status, returns if the submission is judged."""
+        self.status = status
+
+        check = r"[green]\[✓] [/green]"
+        cross = r"[red]\[✕] [/red]"
+        quest = r"[blue]\[?] [/blue]"
+
+        match status:
+            case PollStatusPreparing(msg=msg):
+                self.prepare_task.msg = self._msg(f"Preparing: {escape(msg)}...")
+            case PollStatusPrepareErr(msg=msg):
+                self.prepare_task.fail(self._msg(f"Preparing: {msg}"))
+                return True
+            case PollStatusRunning(
+                total_test_cases=total_test_cases,
+                successful_test_cases=successful_test_cases,
+            ):
+                self.prepare_task.ok(self._msg("Preparing: Ok"))
+
+                rest = total_test_cases - successful_test_cases
+                checks = check * successful_test_cases + quest * rest
+                msg = self._msg(f"Running: {checks}")
+
+                if not self.running_task:
+                    self.running_task = self.tctx.add_task(msg)
+                else:
+                    self.running_task.msg = msg
+            case PollStatusAccepted(total_test_cases=total_test_cases):
+                self.prepare_task.ok(self._msg("Preparing: Ok"))
+
+                msg = self._msg(f"Running: {check * total_test_cases}")
+                if self.running_task:
+                    self.running_task.ok(msg)
+                else:
+                    self.running_task = self.tctx.add_task(msg)
+                    self.running_task.ok()
+                return True
+            case PollStatusErr(
+                total_test_cases=total_test_cases,
+                successful_test_cases=successful_test_cases,
+                msg=status_err,
+            ):
+                self.prepare_task.ok(self._msg("Preparing: Ok"))
+
+                rest = total_test_cases - successful_test_cases - 1
+                checks = check * successful_test_cases + cross + quest * rest
+                msg = self._msg(f"Running: {checks}")
+
+                if self.running_task:
+                    self.running_task.fail(msg)
+                else:
+                    self.running_task = self.tctx.add_task(msg)
+                    self.running_task.fail()
+                self.tctx.console.print(
+                    self._msg(
                         f"Error on test case {successful_test_cases + 1}:"
                         f" {escape(status_err)}"
                     )
-                    break
-                case _:
-                    assert_never(status)
+                )
+                return True
+            case _:
+                assert_never(status)
+
+        return False
+
+
+def live_poll_submissions(
+    submissions: dict[str, str],
+    kattis: KattisSession,
+    tctx: TaskContext | None = None,
+) -> dict[str, PollStatus]:
+    """Poll the status of submissions, by id with a label to show them by,
+    until none of them are running. Returns the final status of each."""
+
+    with contextlib.ExitStack() as stack:
+        if tctx is None:
+            tctx = stack.enter_context(TaskContext())
 
-            time.sleep(0.25)
+        pending = [
+            _TrackedSubmission(submission_id, label, tctx)
+            for submission_id, label in submissions.items()
+        ]
+        judged: dict[str, PollStatus] = {}
+
+        while pending:
+            tracked = min(pending, key=lambda t: t.next_poll)
+            time.sleep(max(0.0, tracked.next_poll - time.monotonic()))
+
+            status = poll(tracked.submission_id, kattis)
+            if tracked.update(status):
+                pending.remove(tracked)
+                judged[tracked.submission_id] = status
+            else:
+                tracked.interval = next_poll_interval(status, tracked.interval)
+                tracked.next_poll = time.monotonic() + tracked.interval
+
+    return judged
+
+
+def live_poll_submission(submission_id: str, kattis: KattisSession) -> PollStatus:
+    """Poll a submission's status until it isn't running."""
+    return live_poll_submissions({submission_id: submission_id}, kattis)[submission_id]
+
+
+def track(submission_ids: list[str], config: Config):
+    """Resume polling earlier submissions."""
+    live_poll_submissions(
+        {submission_id: submission_id for submission_id in submission_ids},
+        KattisSession.from_config(config),
+    )
@@ -1,47 +1,111 @@
+import contextlib
+import dataclasses
+import itertools
 import os.path as path
 
 import click
 from rich.console import Console
 
 from nekontrol import language, problems
+from nekontrol.config import Config
+from nekontrol.problems.sources.kattis import KattisSource
+from nekontrol.problems.sources.local import LocalSource
+from nekontrol.validator import OutputValidator
 
 from ..tasks import TaskContext
 from . import run
 
 
-def test(file_path, problem, config):
+def validator_lang(
+    validator_path: str, config: Config, tctx: TaskContext | None
+) -> language.Language:
+    """The language of an output validator, which runs without limits."""
+    validator_config = dataclasses.replace(
+        config, time_limit=None, cpu_limit=None, memory_limit=None
+    )
+    lang = language.get_lang(validator_path, validator_config, tctx=tctx)
+
+    if lang is None:
+        _, extension = path.splitext(validator_path)
+        raise click.ClickException(
+            f"Language for validator file extension {extension} is not implemented."
+        )
+
+    return lang
+
+
+def test_solution(
+    file_path: str,
+    problem: str | None,
+    config: Config,
+    tctx: TaskContext,
+    c: Console,
+) -> bool:
+    """Run a solution on its samples, returns if it passed all of them."""
     file_path = path.abspath(file_path)
     file_name = path.basename(file_path)
     file_dir = path.dirname(file_path)
     file_base, extension = path.splitext(file_name)
 
-    c = Console()
-
-    fail = False
+    ok = True
 
     if problem is None:
         if config.verbose:
             c.print(f"[yellow]No problem name specified, guessing '{file_base}'")
         problem = file_base
 
-    with TaskContext(console=c) as tctx:
-        samples = problems.problem_samples(file_base, file_dir, config, tctx=tctx)
+    # Fetch samples while compiling, and run the samples of each source as
+    # soon as they are available. Local files are matched by the file name,
+    # Kattis by the problem
+    fetched = itertools.chain(
+        problems.fetch_problem_samples(
+            file_base, file_dir, config, tctx=tctx, sources=[LocalSource()]
+        ),
+        problems.fetch_problem_samples(
+            problem, file_dir, config, tctx=tctx, sources=[KattisSource()]
+        ),
+    )
 
-        if len(samples) == 0:
-            raise click.ClickException(f"Found no inputs to run for problem {problem}")
+    lang = language.get_lang(file_path, config, tctx=tctx)
 
-        lang = language.get_lang(file_path, config, tctx=tctx)
+    if lang is None:
+        raise click.ClickException(
+            f"Language for file extension {extension} is not implemented."
+        )
 
-        if lang is None:
-            raise click.ClickException(
-                f"Language for file extension {extension} is not implemented."
+    with contextlib.ExitStack() as stack:
+        validator = None
+        if config.output_validator is not None:
+            validator = OutputValidator(
+                stack.enter_context(
+                    validator_lang(config.output_validator, config, tctx)
+                ),
+                ignore_debug=config.ignore_debug,
+                ignore_inline_debug=config.ignore_inline_debug,
             )
 
-        with lang as runnable:
-            for sample in samples:
-                res = run.run(file_name, runnable, sample, config, tctx=tctx, c=c)
-                if not res:
-                    fail = True
+        runnable = stack.enter_context(lang)
+
+        sample_count = 0
+        for samples in fetched:
+            sample_count += len(samples)
+
+            if not run.run_samples(
+                runnable, samples, config, tctx=tctx, c=c, validator=validator
+            ):
+                ok = False
+
+    if sample_count == 0:
+        raise click.ClickException(f"Found no inputs to run for problem {problem}")
+
+    return ok
+
+
+def test(file_path, problem, config):
+    c = Console()
+
+    with TaskContext(console=c) as tctx:
+        ok = test_solution(file_path, problem, config, tctx, c)
 
-    if fail:
+    if not ok:
         exit(1)
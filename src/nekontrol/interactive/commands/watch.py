@@ -0,0 +1,191 @@
+import hashlib
+import os
+import os.path as path
+import time
+
+import click
+from rich.console import Console
+from rich.markup import escape
+
+from nekontrol import language, problems
+from nekontrol.binary_cache import hash_file
+from nekontrol.config import Config
+from nekontrol.language import Language, Runnable
+from nekontrol.problems.sample import ProblemSample
+from nekontrol.problems.sources import local
+from nekontrol.problems.sources.kattis import KattisSource
+from nekontrol.problems.sources.local import LocalSource
+from nekontrol.validator import OutputValidator
+from nekontrol.watcher import Watcher
+
+from ..tasks import TaskContext
+from . import run
+from .test import validator_lang
+
+
+class PreparedLanguage:
+    """A language that is only prepared again when its source changes."""
+
+    def __init__(self, lang: Language):
+        self.lang = lang
+        self.runnable: Runnable | None = None
+        self._digest: str | None = None
+
+    def invalidate(self):
+        """Prepare again next time, even if the source is unchanged."""
+        self._digest = None
+
+    def prepare(self, tctx: TaskContext) -> Runnable:
+        h = hashlib.sha256()
+        hash_file(h, self.lang.source_file)
+        digest = h.hexdigest()
+
+        if self.runnable is not None and digest == self._digest:
+            return self.runnable
+
+        self.cleanup()
+        self.lang.tctx = tctx
+        try:
+            self.runnable = self.lang.prepare()
+        except BaseException:
+            # Nothing of a failed prepare is reused, it is tried again next time
+            self.lang.cleanup()
+            self.runnable = None
+            self._digest = None
+            raise
+        self._digest = digest
+        return self.runnable
+
+    def cleanup(self):
+        if self.runnable is not None:
+            self.lang.cleanup()
+            self.runnable = None
+
+
+def watch(file_path: str, problem: str | None, config: Config):
+    file_path = path.abspath(file_path)
+    file_name = path.basename(file_path)
+    file_dir = path.dirname(file_path)
+    file_base, extension = path.splitext(file_name)
+
+    c = Console()
+
+    if problem is None:
+        if config.verbose:
+            c.print(f"[yellow]No problem name specified, guessing '{file_base}'")
+        problem = file_base
+
+    lang = language.get_lang(file_path, config)
+    if lang is None:
+        raise click.ClickException(
+            f"Language for file extension {extension} is not implemented."
+        )
+    solution = PreparedLanguage(lang)
+
+    validator = None
+    if config.output_validator is not None:
+        validator = PreparedLanguage(
+            validator_lang(path.abspath(config.output_validator), config, None)
+        )
+
+    def is_local_sample(file: str) -> bool:
+        return local.is_sample_file(file, file_base, file_dir, config.sample_patterns)
+
+    def in_libs_dir(file: str) -> bool:
+        libs_dir = config.cpp_libs_dir
+        return libs_dir is not None and file.startswith(path.abspath(libs_dir) + os.sep)
+
+    watched = [(file_dir, False)]
+    watched += [
+        (dir, True)
+        for dir in local.sample_dirs(file_base, file_dir, config.sample_patterns)
+    ]
+    if config.cpp_libs_dir is not None:
+        watched.append((config.cpp_libs_dir, True))
+    if validator is not None:
+        watched.append((path.dirname(validator.lang.source_file), False))
+
+    # Samples from Kattis are fetched once, local samples whenever they change
+    with TaskContext(console=c) as tctx:
+        remote_samples = problems.problem_samples(
+            problem, file_dir, config, tctx=tctx, sources=[KattisSource()]
+        )
+    local_samples = _local_samples(file_base, file_dir, config)
+    failed: set[str] = set()
+
+    try:
+        with Watcher(watched) as watcher:
+            while True:
+                samples = local_samples + remote_samples
+                # Samples that failed last time first, they are the interesting ones
+                samples.sort(key=lambda s: s.name not in failed)
+
+                c.rule(time.strftime("%H:%M:%S"))
+                if not samples:
+                    c.print(f"[yellow]Found no inputs to run for problem {problem}")
+
+                with TaskContext(console=c) as tctx:
+                    try:
+                        runnable = solution.prepare(tctx)
+                        output_validator = (
+                            OutputValidator(
+                                validator.prepare(tctx),
+                                ignore_debug=config.ignore_debug,
+                                ignore_inline_debug=config.ignore_inline_debug,
+                            )
+                            if validator is not None
+                            else None
+                        )
+                    except click.ClickException as e:
+                        c.print(f"[red]{escape(e.message)}")
+                    else:
+                        results = run.run_each_sample(
+                            runnable,
+                            samples,
+                            config,
+                            tctx=tctx,
+                            c=c,
+                            validator=output_validator,
+                        )
+                        failed = {
+                            sample.name
+                            for sample, ok in zip(samples, results)
+                            if not ok
+                        }
+
+                c.print("[bright_black]Watching for changes, press Ctrl+C to stop")
+
+                while True:
+                    changed = watcher.wait()
+
+                    if any(in_libs_dir(file) for file in changed):
+                        solution.invalidate()
+                    if any(is_local_sample(file) for file in changed):
+                        local_samples = _local_samples(file_base, file_dir, config)
+
+                    if (
+                        file_path in changed
+                        or (
+                            validator is not None
+                            and validator.lang.source_file in changed
+                        )
+                        or any(
+                            is_local_sample(file) or in_libs_dir(file)
+                            for file in changed
+                        )
+                    ):
+                        break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        solution.cleanup()
+        if validator is not None:
+            validator.cleanup()
+
+
+def _local_samples(
+    file_base: str, file_dir: str, config: Config
+) -> list[ProblemSample]:
+    return problems.problem_samples(
+        file_base, file_dir, config, sources=[LocalSource()]
+    )
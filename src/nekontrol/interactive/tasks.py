@@ -1,3 +1,5 @@
+import threading
+
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TaskID, TextColumn
 
@@ -9,6 +11,9 @@ class TaskContext:
             TextColumn("[progress.description]{task.description}"),
             console=console,
         )
+        # Tasks may be added and finished from worker threads, finishing a
+        # task consists of several progress operations that must not interleave
+        self._lock = threading.RLock()
 
     def __enter__(self, *args, **kwargs):
         self.p.__enter__(*args, **kwargs)
@@ -18,16 +23,19 @@ class TaskContext:
         self.p.__exit__(*args, **kwargs)
 
     def _finish_task(self, t: TaskID, msg: str, icon: str | None = None):
-        self.p.print(("  " if icon is None else icon + " ") + msg, highlight=False)
-        self.p.remove_task(t)
-        self.p.refresh()
+        with self._lock:
+            self.p.print(("  " if icon is None else icon + " ") + msg, highlight=False)
+            self.p.remove_task(t)
+            self.p.refresh()
 
     def add_task(self, msg: str) -> "Task":
-        t_id = self.p.add_task(msg)
+        with self._lock:
+            t_id = self.p.add_task(msg)
         return Task(t_id, self, msg)
 
     def update_task(self, task_id: TaskID, *args, **kwargs):
-        self.p.update(task_id, *args, **kwargs)
+        with self._lock:
+            self.p.update(task_id, *args, **kwargs)
 
     @property
     def console(self) -> Console:
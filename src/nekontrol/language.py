@@ -1,25 +1,119 @@
+import contextlib
+import hashlib
+import io
+import json
+import math
 import os
 import platform
 import shutil
+import signal
 import subprocess
+import sys
 import tempfile
-from dataclasses import dataclass
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
 from os import path
-from typing import Callable, ClassVar, Protocol, Union, assert_never
+from typing import IO, Callable, ClassVar, Protocol, Sequence, Union, assert_never
 
 from click import ClickException
 
 from nekontrol.interactive.tasks import TaskContext
 
-from . import util
+from . import cpp_libs, util
+from .binary_cache import (
+    BinaryCache,
+    CachedBinary,
+    CachedError,
+    compiler_version,
+    hash_dir,
+    hash_file,
+)
 from .config import Config
 
 
+class LimitExceeded(Enum):
+    TIME = "Time limit exceeded"
+    MEMORY = "Memory limit exceeded"
+
+
+@dataclass(frozen=True)
+class Limits:
+    """Resource limits enforced on each run, None for no limit, and the CPU
+    it runs on."""
+
+    wall_time: float | None = None
+    """Wall clock time in seconds"""
+    cpu_time: float | None = None
+    """CPU time in seconds"""
+    memory: int | None = None
+    """Address space in bytes"""
+    cpu: int | None = None
+    """The CPU the process is pinned to right after it starts, where
+    supported"""
+
+    @staticmethod
+    def from_config(config: Config) -> "Limits":
+        return Limits(
+            wall_time=config.time_limit,
+            cpu_time=config.cpu_limit,
+            memory=(
+                config.memory_limit * 1024 * 1024
+                if config.memory_limit is not None
+                else None
+            ),
+            cpu=config.pin_cpu,
+        )
+
+
 @dataclass
 class RunResult:
     exit: int
     stdout: str
     stderr: str
+    limit_exceeded: LimitExceeded | None = field(default=None, compare=False)
+    """The limit the process was killed for (or crashed on), if any"""
+    # Resource usage is not part of the result when comparing
+    wall_time: float | None = field(default=None, compare=False)
+    """Wall clock time in seconds from starting to reaping the process"""
+    user_time: float | None = field(default=None, compare=False)
+    """User CPU time in seconds, if available on the platform"""
+    sys_time: float | None = field(default=None, compare=False)
+    """System CPU time in seconds, if available on the platform"""
+    max_rss: int | None = field(default=None, compare=False)
+    """Peak resident set size in bytes, if available on the platform"""
+    max_rss_upper_bound: bool = field(default=False, compare=False)
+    """If max_rss is only an upper bound of the peak memory usage.
+
+    On Linux the peak memory of a process includes the memory of the process
+    that spawned it, until it execs. If the measured peak isn't larger than
+    the memory of nekontrol itself, the real peak could be smaller.
+    """
+
+    stdout_path: str | None = field(default=None, compare=False)
+    """If set, stdout was spooled to this file and the stdout field is empty"""
+
+    @property
+    def cpu_time(self) -> float | None:
+        if self.user_time is None or self.sys_time is None:
+            return None
+        return self.user_time + self.sys_time
+
+    def open_stdout(self) -> IO[str]:
+        """Open stdout for streaming, wherever it is stored."""
+        if self.stdout_path is not None:
+            return open(self.stdout_path, "r", encoding="utf-8", errors="replace")
+        return io.StringIO(self.stdout)
+
+    def read_stdout(self) -> str:
+        with self.open_stdout() as f:
+            return f.read()
+
+    def cleanup(self):
+        """Remove the spooled stdout, if any."""
+        if self.stdout_path is not None and path.exists(self.stdout_path):
+            os.remove(self.stdout_path)
 
 
 @dataclass
@@ -36,12 +130,20 @@ class CompileError:
 CompileResult = Union[CompileOk, CompileError]
 
 
+@dataclass(frozen=True)
+class FileInput:
+    """Input that is read by the process directly from a file."""
+
+    path: str
+
+
 class Runnable:
-    def __init__(self, run: Callable[[str], RunResult]):
+    def __init__(self, run: Callable[[str | FileInput, Sequence[str]], RunResult]):
         self._run = run
 
-    def run(self, input_file: str) -> RunResult:
-        return self._run(input_file)
+    def run(self, input_file: str | FileInput, args: Sequence[str] = ()) -> RunResult:
+        """Run with the given input and extra command line arguments."""
+        return self._run(input_file, args)
 
 
 class Language(Protocol):
@@ -87,7 +189,12 @@ class InterpretedLanguage(Language, Protocol):
         self.bin = bin
 
     def prepare(self) -> Runnable:
-        return Runnable(run=lambda i: generic_run([self.bin, self.source_file], i))
+        limits = Limits.from_config(self.config)
+        return Runnable(
+            run=lambda i, args: generic_run(
+                [self.bin, self.source_file, *args], i, limits
+            )
+        )
 
 
 class Python(InterpretedLanguage):
@@ -101,6 +208,21 @@ class Python(InterpretedLanguage):
         "python",
     ]
     kattis_name = "Python 3"
+    warm_pool: "WarmPool | None" = None
+
+    def prepare(self) -> Runnable:
+        if not (self.config.warm_workers and hasattr(os, "fork")):
+            return super().prepare()
+
+        self.warm_pool = WarmPool(
+            [self.bin, FORK_SERVER, self.source_file], Limits.from_config(self.config)
+        )
+        return Runnable(run=self.warm_pool.run)
+
+    def cleanup(self):
+        if self.warm_pool is not None:
+            self.warm_pool.close()
+            self.warm_pool = None
 
 
 class Lua(InterpretedLanguage):
@@ -115,24 +237,66 @@ class JSNode(InterpretedLanguage):
 
 class CompiledLanguage(Language, Protocol):
     compiled_output: str
+    _owns_output: bool = False
 
     @property
     def cmdline(self) -> list[str]: ...
 
+    @property
+    def compile_cmdline(self) -> list[str]:
+        """The cmdline with the extra flags for the language from the config."""
+        extra_flags = (self.config.extra_flags or {}).get(self.kattis_name, [])
+        return self.cmdline + extra_flags
+
     def prepare(self) -> Runnable:
         task = (
             self.tctx.add_task(f"Compiling {self.source_file} ") if self.tctx else None
         )
 
-        self.compiled_output = tempfile.mktemp()
-        compile_result = self.compile()
+        cache = (
+            BinaryCache(BinaryCache.default_dir(), self.config.binary_cache_size)
+            if self.config.binary_cache
+            else None
+        )
+
+        if cache is not None:
+            self.compiled_output = cache.new_output_path()
+            key = self.cache_key()
+
+            match cache.lookup(key):
+                case CachedBinary(path=cached_path):
+                    self.compiled_output = cached_path
+                    compile_result = CompileOk()
+                case CachedError(exit=exit, stderr=stderr):
+                    compile_result = CompileError(exit=exit, stderr=stderr)
+                case None:
+                    self._owns_output = True
+                    compile_result = self.compile()
+
+                    match compile_result:
+                        case CompileOk():
+                            self.compiled_output = cache.store_binary(
+                                key, self.compiled_output
+                            )
+                            self._owns_output = False
+                        case CompileError(exit, stderr):
+                            cache.store_error(key, exit, stderr)
+        else:
+            self.compiled_output = tempfile.mktemp()
+            self._owns_output = True
+            compile_result = self.compile()
 
         match compile_result:
             case CompileOk():
                 if task:
                     task.ok()
 
-                return Runnable(lambda i: generic_run([self.compiled_output], i))
+                limits = Limits.from_config(self.config)
+                return Runnable(
+                    lambda i, args: generic_run(
+                        [self.compiled_output, *args], i, limits
+                    )
+                )
             case CompileError(exit, stderr):
                 if task:
                     task.fail()
@@ -145,11 +309,36 @@ class CompiledLanguage(Language, Protocol):
                 assert_never(compile_result)
 
     def cleanup(self):
-        if path.exists(self.compiled_output):
+        if self._owns_output and path.exists(self.compiled_output):
             os.remove(self.compiled_output)
 
-    def run(self, input_file: str):
-        return generic_run([self.compiled_output], input_file)
+    @property
+    def volatile_paths(self) -> list[str]:
+        """Paths in cmdline that differ between otherwise identical compiles."""
+        return [self.compiled_output]
+
+    def hash_dependencies(self, h: "hashlib._Hash"):
+        """Hash everything besides the source file that affects the binary."""
+
+    def cache_key(self) -> str:
+        """A hash identifying the binary that compiling would produce."""
+        cmdline = self.compile_cmdline
+        for i, arg in enumerate(cmdline):
+            for volatile_path in self.volatile_paths:
+                arg = arg.replace(volatile_path, "<tmp>")
+            cmdline[i] = arg
+
+        h = hashlib.sha256()
+        hash_file(h, self.source_file)
+        h.update(json.dumps(cmdline).encode("utf-8"))
+        h.update(compiler_version(cmdline[0]).encode("utf-8"))
+        self.hash_dependencies(h)
+        return h.hexdigest()
+
+    def run(self, input_file: str | FileInput):
+        return generic_run(
+            [self.compiled_output], input_file, Limits.from_config(self.config)
+        )
 
     def compile(self) -> CompileResult:
         """Compile the file.
@@ -159,7 +348,7 @@ class CompiledLanguage(Language, Protocol):
             code was non-0.
         """
         p = subprocess.Popen(
-            self.cmdline, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            self.compile_cmdline, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
         )
         _, stderr = p.communicate()
         exit_code = p.returncode
@@ -172,30 +361,79 @@ class CompiledLanguage(Language, Protocol):
 
 class Cpp(CompiledLanguage):
     kattis_name = "C++"
+    lib_objects: list[str] | None = None
+    pch_dir: str | None = None
+
+    @property
+    def color_flag(self) -> str:
+        return f"-fdiagnostics-color={'always' if self.config.color else 'never'}"
 
     @property
     def cmdline(self) -> list[str]:
-        cmdline = [
-            "c++",
+        cmdline = ["c++"]
+
+        if self.pch_dir is not None:
+            cmdline.append(f"-I{self.pch_dir}")
+
+        cmdline += [
             "--std=c++17",
             self.source_file,
             "-o",
             self.compiled_output,
-            f"-fdiagnostics-color={'always' if self.config.color else 'never'}",
+            self.color_flag,
         ]
 
         if self.config.cpp_libs_dir is not None:
-            cpp_sources = []
-            for root, _, files in os.walk(self.config.cpp_libs_dir):
-                for file in files:
-                    _, ext = path.splitext(file)
-                    if ext in {".cc", ".cpp", ".cxx"}:
-                        cpp_sources.append(path.join(root, file))
-
-            cmdline += [f"-I{self.config.cpp_libs_dir}"] + cpp_sources
+            cmdline += [f"-I{self.config.cpp_libs_dir}"] + (
+                self.lib_objects
+                if self.lib_objects is not None
+                else cpp_libs.find_lib_sources(self.config.cpp_libs_dir)
+            )
 
         return cmdline
 
+    @property
+    def code_flags(self) -> list[str]:
+        """The flags of compile_cmdline that affect the generated code, which
+        the precompiled header and library objects must be built with too."""
+        return ["--std=c++17"] + (self.config.extra_flags or {}).get(
+            self.kattis_name, []
+        )
+
+    def compile(self) -> CompileResult:
+        if not self.config.binary_cache:
+            return super().compile()
+
+        cache = BinaryCache(BinaryCache.default_dir(), self.config.binary_cache_size)
+
+        # The header and objects must stay in the cache until they are used
+        with contextlib.ExitStack() as pins:
+            if self.config.cpp_pch is not None:
+                self.pch_dir = cpp_libs.build_pch(
+                    cache, "c++", self.code_flags, self.config.cpp_pch, pins
+                )
+
+            if self.config.cpp_libs_dir is not None:
+                lib_objects = cpp_libs.build_lib_objects(
+                    cache,
+                    "c++",
+                    self.code_flags
+                    + [self.color_flag, f"-I{self.config.cpp_libs_dir}"],
+                    self.config.cpp_libs_dir,
+                    pins,
+                )
+                if isinstance(lib_objects, CachedError):
+                    return CompileError(
+                        exit=lib_objects.exit, stderr=lib_objects.stderr
+                    )
+                self.lib_objects = lib_objects
+
+            return super().compile()
+
+    def hash_dependencies(self, h: "hashlib._Hash"):
+        if self.config.cpp_libs_dir is not None:
+            hash_dir(h, self.config.cpp_libs_dir)
+
 
 class Rust(CompiledLanguage):
     kattis_name = "Rust"
@@ -227,6 +465,10 @@ class Haskell(CompiledLanguage):
         super().cleanup()
         shutil.rmtree(self.temp_out_dir)
 
+    @property
+    def volatile_paths(self) -> list[str]:
+        return super().volatile_paths + [self.temp_out_dir]
+
     @property
     def cmdline(self):
         cmdline = [
@@ -248,38 +490,414 @@ class Haskell(CompiledLanguage):
         return cmdline
 
 
+languages: dict[str, type[Language]] = {
+    ".cc": Cpp,
+    ".cpp": Cpp,
+    ".cxx": Cpp,
+    ".c++": Cpp,
+    ".py": Python,
+    ".hs": Haskell,
+    ".rs": Rust,
+    ".lua": Lua,
+    ".js": JSNode,
+}
+"""The languages by the extension of their source files"""
+
+
 def get_lang(
     source_file: str, config: Config, tctx: TaskContext | None = None
 ) -> Language | None:
     _, ext = path.splitext(source_file)
-    match ext:
-        case ".cc" | ".cpp" | ".cxx" | ".c++":
-            return Cpp(source_file, config, tctx=tctx)
-        case ".py":
-            return Python(source_file, config, tctx=tctx)
-        case ".hs":
-            return Haskell(source_file, config, tctx=tctx)
-        case ".rs":
-            return Rust(source_file, config, tctx=tctx)
-        case ".lua":
-            return Lua(source_file, config, tctx=tctx)
-        case ".js":
-            return JSNode(source_file, config, tctx=tctx)
-        case _:
-            return None
+    lang = languages.get(ext)
+    if lang is None:
+        return None
+    return lang(source_file, config, tctx=tctx)
+
+
+def generic_run(
+    cmdline: list[str], input: str | FileInput, limits: Limits = Limits()
+) -> RunResult:
+    """Run a program with the given input.
+
+    A FileInput is connected directly as the stdin of the process and stdout
+    is spooled to a temporary file, see RunResult.stdout_path.
+    """
+    with contextlib.ExitStack() as files:
+        if isinstance(input, FileInput):
+            stdin = files.enter_context(open(input.path, "rb"))
+            stdout_fd, stdout_path = tempfile.mkstemp(prefix="nk-stdout-")
+            stdout = files.enter_context(os.fdopen(stdout_fd, "wb"))
+            input_bytes = None
+        else:
+            stdin = stdout = subprocess.PIPE
+            stdout_path = None
+            input_bytes = input.encode("utf-8")
 
+        start = time.perf_counter()
+        p = subprocess.Popen(
+            _limited_cmdline(cmdline, limits),
+            stdin=stdin,
+            stdout=stdout,
+            stderr=subprocess.PIPE,
+        )
 
-def generic_run(cmdline: list[str], input: str) -> RunResult:
-    p = subprocess.Popen(
-        cmdline,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+    if limits.cpu is not None and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(p.pid, {limits.cpu})
+        except OSError:
+            # Already exited
+            pass
+
+    # Kill the process once the wall time limit passes, the pipes are closed
+    # when it dies so reading the output below won't hang
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        p.kill()
+
+    timer = None
+    if limits.wall_time is not None:
+        timer = threading.Timer(limits.wall_time, kill)
+        timer.daemon = True
+        timer.start()
+
+    try:
+        if not hasattr(os, "wait4"):
+            stdout_bytes, stderr_bytes = p.communicate(input=input_bytes)
+            wall_time = time.perf_counter() - start
+            result = RunResult(
+                exit=p.returncode,
+                stdout=_decode(stdout_bytes),
+                stderr=_decode(stderr_bytes),
+                wall_time=wall_time,
+            )
+        else:
+            result = _run_with_usage(p, input_bytes, start)
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+    result.stdout_path = stdout_path
+    result.limit_exceeded = _exceeded_limit(result, limits, timed_out.is_set())
+    return result
+
+
+def _decode(output: bytes | None) -> str:
+    return "" if output is None else output.decode("utf-8", errors="replace")
+
+
+def _run_with_usage(
+    p: subprocess.Popen, input: bytes | None, start: float
+) -> RunResult:
+    # Not available on Windows, but neither is wait4
+    import resource
+
+    stdout_bytes, stderr_bytes = _communicate_without_wait(p, input)
+
+    # Reap the child ourselves, wait4 gives us the resource usage of exactly
+    # this process, which is not the case for getrusage(RUSAGE_CHILDREN) when
+    # several samples run at the same time.
+    _, status, usage = os.wait4(p.pid, 0)
+    wall_time = time.perf_counter() - start
+    p.returncode = os.waitstatus_to_exitcode(status)
+
+    max_rss = _rss_bytes(usage.ru_maxrss)
+    own_max_rss = _rss_bytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+    return RunResult(
+        exit=p.returncode,
+        stdout=_decode(stdout_bytes),
+        stderr=_decode(stderr_bytes),
+        wall_time=wall_time,
+        user_time=usage.ru_utime,
+        sys_time=usage.ru_stime,
+        max_rss=max_rss,
+        max_rss_upper_bound=max_rss <= own_max_rss,
     )
-    byte_streams = p.communicate(input=input.encode("utf-8"))
-    exit_code = p.returncode
-    stdout, stderr = [s.decode("utf-8") for s in byte_streams]
-    return RunResult(exit=exit_code, stdout=stdout, stderr=stderr)
+
+
+def _limited_cmdline(cmdline: list[str], limits: Limits) -> list[str]:
+    """Run the program through sh, which applies the CPU time and memory
+    limits with ulimit before it execs the program.
+
+    Setting them in a preexec_fn instead isn't safe while other threads are
+    running, as they are when several samples run at the same time.
+    """
+    if os.name != "posix":
+        # Windows, only the wall time limit can be enforced
+        return cmdline
+
+    commands = []
+    if limits.cpu_time is not None:
+        # The kernel sends SIGXCPU at the soft limit and SIGKILL at the hard
+        # one. The soft limit is lowered first, it can't be above the hard one
+        seconds = max(1, math.ceil(limits.cpu_time))
+        commands += [f"ulimit -S -t {seconds}", f"ulimit -H -t {seconds + 1}"]
+    if limits.memory is not None:
+        commands.append(f"ulimit -v {limits.memory // 1024}")
+
+    if not commands:
+        return cmdline
+    script = " && ".join(commands + ['exec "$@"'])
+    return ["/bin/sh", "-c", script, "nk-limits", *cmdline]
+
+
+# What failed allocations look like in the languages we support
+_out_of_memory_messages = [
+    "MemoryError",
+    "std::bad_alloc",
+    "memory allocation of",
+    "out of memory",
+    "Cannot allocate memory",
+]
+
+
+def _exceeded_limit(
+    result: RunResult, limits: Limits, timed_out: bool
+) -> LimitExceeded | None:
+    if timed_out:
+        return LimitExceeded.TIME
+
+    # RLIMIT_CPU is in whole seconds, so a run can go over a fractional limit
+    # and still exit cleanly
+    if limits.cpu_time is not None:
+        if result.cpu_time is not None and result.cpu_time >= limits.cpu_time:
+            return LimitExceeded.TIME
+        if hasattr(signal, "SIGXCPU") and result.exit == -signal.SIGXCPU:
+            return LimitExceeded.TIME
+
+    if result.exit == 0:
+        return None
+
+    if limits.memory is not None:
+        # The process isn't killed when it reaches the limit, allocations just
+        # start failing, so look for the usual ways programs die from that
+        if (result.max_rss is not None and result.max_rss >= limits.memory) or any(
+            message in result.stderr for message in _out_of_memory_messages
+        ):
+            return LimitExceeded.MEMORY
+
+    return None
+
+
+FORK_SERVER = path.join(path.dirname(__file__), "fork_server.py")
+
+
+class WarmServer:
+    """A running fork_server.py, which runs one request at a time."""
+
+    def __init__(self, cmdline: list[str]):
+        self.p = subprocess.Popen(
+            cmdline,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._ready = False
+
+    def _read(self) -> dict:
+        assert self.p.stdout
+        line = self.p.stdout.readline()
+        if not line:
+            raise ClickException(
+                f"Warm worker exited unexpectedly with code {self.p.wait()}"
+            )
+        return json.loads(line)
+
+    def wait_ready(self):
+        """Wait until the interpreter has started and imported everything."""
+        if not self._ready:
+            self._read()
+            self._ready = True
+
+    def run(self, request: dict, on_start: Callable[[int], None]) -> dict:
+        assert self.p.stdin
+        self.p.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+        self.p.stdin.flush()
+        on_start(self._read()["pid"])
+        return self._read()
+
+    def close(self):
+        if self.p.stdin:
+            self.p.stdin.close()
+        self.p.wait()
+
+
+class WarmPool:
+    """Runs a Python program by forking pre-started interpreters.
+
+    One server is started per concurrent run, the time it takes to start an
+    interpreter and import modules is not part of the measured wall time.
+    """
+
+    def __init__(self, cmdline: list[str], limits: Limits = Limits()):
+        self.cmdline = cmdline
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._idle: list[WarmServer] = [WarmServer(cmdline)]
+        self._all = list(self._idle)
+
+    def _acquire(self) -> WarmServer:
+        with self._lock:
+            while self._idle:
+                server = self._idle.pop()
+                if server.p.poll() is None:
+                    return server
+                self._all.remove(server)
+
+            server = WarmServer(self.cmdline)
+            self._all.append(server)
+            return server
+
+    def _release(self, server: WarmServer):
+        with self._lock:
+            if server.p.poll() is not None:
+                # Died during the run, start a fresh one in its place so that
+                # later runs don't fail on it
+                self._all.remove(server)
+                server = WarmServer(self.cmdline)
+                self._all.append(server)
+            self._idle.append(server)
+
+    def close(self):
+        with self._lock:
+            for server in self._all:
+                server.close()
+            self._all = []
+            self._idle = []
+
+    def run(self, input: str | FileInput, args: Sequence[str] = ()) -> RunResult:
+        with contextlib.ExitStack() as temp_files:
+
+            def temp_file() -> str:
+                fd, file_path = tempfile.mkstemp(prefix="nk-warm-")
+                os.close(fd)
+                temp_files.callback(os.remove, file_path)
+                return file_path
+
+            if isinstance(input, FileInput):
+                stdin_path = input.path
+                fd, stdout_path = tempfile.mkstemp(prefix="nk-stdout-")
+                os.close(fd)
+            else:
+                stdin_path = temp_file()
+                with open(stdin_path, "wb") as f:
+                    f.write(input.encode("utf-8"))
+                stdout_path = temp_file()
+            stderr_path = temp_file()
+
+            request = {
+                "stdin": stdin_path,
+                "stdout": stdout_path,
+                "stderr": stderr_path,
+                "args": list(args),
+                "cpu_limit": (
+                    max(1, math.ceil(self.limits.cpu_time))
+                    if self.limits.cpu_time is not None
+                    else None
+                ),
+                "memory_limit": self.limits.memory,
+                "cpu": self.limits.cpu,
+            }
+
+            timed_out = threading.Event()
+            timers: list[threading.Timer] = []
+
+            def on_start(pid: int):
+                if self.limits.wall_time is None:
+                    return
+
+                def kill():
+                    timed_out.set()
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+
+                timer = threading.Timer(self.limits.wall_time, kill)
+                timer.daemon = True
+                timer.start()
+                timers.append(timer)
+
+            server = self._acquire()
+            try:
+                server.wait_ready()
+                start = time.perf_counter()
+                response = server.run(request, on_start)
+                wall_time = time.perf_counter() - start
+            finally:
+                for timer in timers:
+                    timer.cancel()
+                self._release(server)
+
+            with open(stderr_path, "rb") as f:
+                stderr = _decode(f.read())
+
+            if isinstance(input, FileInput):
+                stdout = ""
+            else:
+                with open(stdout_path, "rb") as f:
+                    stdout = _decode(f.read())
+
+        max_rss = _rss_bytes(response["maxrss"])
+        result = RunResult(
+            exit=response["exit"],
+            stdout=stdout,
+            stderr=stderr,
+            wall_time=wall_time,
+            user_time=response["utime"],
+            sys_time=response["stime"],
+            max_rss=max_rss,
+            # The forked process starts out with the memory of the server, if
+            # it didn't grow beyond that the peak may be the server's
+            max_rss_upper_bound=max_rss <= _rss_bytes(response["server_maxrss"]),
+            stdout_path=stdout_path if isinstance(input, FileInput) else None,
+        )
+        result.limit_exceeded = _exceeded_limit(result, self.limits, timed_out.is_set())
+        return result
+
+
+def _rss_bytes(ru_maxrss: int) -> int:
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def _communicate_without_wait(
+    p: subprocess.Popen, input: bytes | None
+) -> tuple[bytes | None, bytes | None]:
+    """Like Popen.communicate, but leaves the process unreaped."""
+    output: dict[str, bytes] = {}
+
+    def read(name: str, stream):
+        output[name] = stream.read()
+        stream.close()
+
+    readers = [
+        threading.Thread(target=read, args=(name, stream), daemon=True)
+        for name, stream in [("stdout", p.stdout), ("stderr", p.stderr)]
+        if stream is not None
+    ]
+    for reader in readers:
+        reader.start()
+
+    if p.stdin is not None:
+        try:
+            if input is not None:
+                p.stdin.write(input)
+        except BrokenPipeError:
+            # The process exited without reading all of the input
+            pass
+        finally:
+            try:
+                p.stdin.close()
+            except BrokenPipeError:
+                pass
+
+    for reader in readers:
+        reader.join()
+
+    return output.get("stdout"), output.get("stderr")
 
 
 def find_bin(options: list[str]) -> str | None:
@@ -1,9 +1,11 @@
-import asyncio
-
-import natsort
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Iterator
 
 from nekontrol.config import Config
-from nekontrol.interactive.tasks import TaskContext
+from nekontrol.interactive.tasks import Task, TaskContext
 
 from .sample import ProblemSample
 from .source import ProblemSource
@@ -11,41 +13,118 @@ from .sources.kattis import KattisSource
 from .sources.local import LocalSource
 
 
-def problem_samples(
-    problem: str, source_dir: str, cfg: Config, tctx: TaskContext | None = None
-) -> list[ProblemSample]:
-    # TODO: No spinners anymore :sad_emoji:, please fix
-    sources: list[ProblemSource] = [LocalSource(), KattisSource()]
-
-    samples: list[list[ProblemSample]] = [[] for _ in sources]
-
-    async def fill_samples(i: int):
-        src = sources[i]
-
-        task = None
-
-        if tctx is not None:
-            task = tctx.add_task(f"{src.source_name}: Fetching")
-
-        samples[i] = src.find_problem(problem, source_dir, cfg=cfg)
+def fetch_problem_samples(
+    problem: str,
+    source_dir: str,
+    cfg: Config,
+    tctx: TaskContext | None = None,
+    sources: list[ProblemSource] | None = None,
+) -> Iterator[list[ProblemSample]]:
+    """Start fetching samples from all sources at the same time.
+
+    The fetching starts right away, iterate over the result to get the
+    sorted samples of each source as soon as that source is done. Sources
+    that fail or don't finish within cfg.fetch_timeout seconds give no
+    samples.
+    """
+    if sources is None:
+        sources = [LocalSource(), KattisSource()]
+
+    # The timeout counts from when fetching starts, not from when the caller
+    # asks for the next samples, which may be after running earlier ones
+    deadline = time.monotonic() + cfg.fetch_timeout
+    finished: queue.Queue[tuple[Future[list[ProblemSample]], float]] = queue.Queue()
+
+    futures = {}
+    for src in sources:
+        task = tctx.add_task(f"{src.source_name}: Fetching") if tctx else None
+        future = _in_background(src.find_problem, problem, source_dir, cfg=cfg)
+        future.add_done_callback(lambda f: finished.put((f, time.monotonic())))
+        futures[future] = (src, task)
+
+    return _completed_samples(futures, finished, deadline)
+
+
+def _in_background(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """Call fn on a daemon thread.
+
+    Sources that time out are left running, with their requests and retries
+    possibly taking much longer than the timeout, so they must not keep the
+    process from exiting like the threads of an executor would.
+    """
+    future: Future = Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, daemon=True).start()
+    return future
+
+
+def _completed_samples(
+    futures: dict[Future[list[ProblemSample]], tuple[ProblemSource, Task | None]],
+    finished: queue.Queue[tuple[Future[list[ProblemSample]], float]],
+    deadline: float,
+) -> Iterator[list[ProblemSample]]:
+    """Yield the samples of the sources in the order they finished, as put in
+    finished with the time they finished, if that was before the deadline."""
+    pending = set(futures)
+    while pending:
+        try:
+            future, finish = finished.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        if finish > deadline:
+            break
+
+        pending.remove(future)
+        src, task = futures[future]
+
+        try:
+            samples = future.result()
+        except Exception as e:
+            if task is not None:
+                task.fail(f"{src.source_name}: {e.__class__.__name__}")
+            continue
 
         if task is not None:
-            if samples[i]:
+            if samples:
                 task.ok()
             else:
                 task.fail()
 
-    async def fill_all_samples():
-        await asyncio.wait(
-            [asyncio.create_task(fill_samples(i)) for i, _ in enumerate(sources)]
-        )
+        yield sorted_problems(samples)
 
-    asyncio.run(fill_all_samples())
+    for future in pending:
+        src, task = futures[future]
+        if task is not None:
+            task.fail(f"{src.source_name}: Timed out")
 
-    return [s for src in samples for s in src]
+
+def problem_samples(
+    problem: str,
+    source_dir: str,
+    cfg: Config,
+    tctx: TaskContext | None = None,
+    sources: list[ProblemSource] | None = None,
+) -> list[ProblemSample]:
+    """Fetch the samples from all sources at the same time."""
+    return [
+        sample
+        for samples in fetch_problem_samples(
+            problem, source_dir, cfg, tctx=tctx, sources=sources
+        )
+        for sample in samples
+    ]
 
 
 def sorted_problems(
     problems: list[ProblemSample],
 ) -> list[ProblemSample]:
-    return natsort.natsorted(problems, key=lambda p: p.source)
+    import natsort
+
+    return natsort.natsorted(problems, key=lambda p: p.name)
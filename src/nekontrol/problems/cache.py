@@ -0,0 +1,161 @@
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from os import path
+
+import appdirs
+
+from .sample import ProblemSample
+
+
+@dataclass
+class CacheEntry:
+    samples: list[ProblemSample] | None
+    """The cached samples, None if fetching them failed"""
+    fetched_at: float
+    """When the samples were fetched or last revalidated, as a unix time"""
+    etag: str | None = None
+    last_modified: str | None = None
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class SampleStore:
+    """An SQLite database of compressed samples from problem sources.
+
+    Entries are evicted in least recently used order once the compressed
+    samples take up more than max_size bytes.
+    """
+
+    # Databases whose tables have been created by this process, by path
+    _ready: set[str] = set()
+    _ready_lock = threading.Lock()
+
+    def __init__(self, db_path: str, max_size: int):
+        self.db_path = db_path
+        self.max_size = max_size
+
+    @staticmethod
+    def default_path() -> str:
+        return path.join(appdirs.user_cache_dir("nekontrol"), "samples.sqlite3")
+
+    def _connect(self) -> sqlite3.Connection:
+        # Sources are fetched from several threads, and processes, at once
+        with SampleStore._ready_lock:
+            if self.db_path not in SampleStore._ready:
+                os.makedirs(path.dirname(self.db_path), exist_ok=True)
+                with contextlib.closing(
+                    sqlite3.connect(self.db_path, timeout=30)
+                ) as db:
+                    _set_up(db)
+                SampleStore._ready.add(self.db_path)
+
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, source: str, problem: str) -> CacheEntry | None:
+        with contextlib.closing(self._connect()) as db, db:
+            row = db.execute(
+                "SELECT data, fetched_at, etag, last_modified FROM samples"
+                " WHERE source = ? AND problem = ?",
+                (source, problem),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            db.execute(
+                "UPDATE samples SET accessed_at = ? WHERE source = ? AND problem = ?",
+                (time.time(), source, problem),
+            )
+
+        data, fetched_at, etag, last_modified = row
+        samples = (
+            [ProblemSample.from_json(o) for o in json.loads(zlib.decompress(data))]
+            if data is not None
+            else None
+        )
+        return CacheEntry(samples, fetched_at, etag, last_modified)
+
+    def put(self, source: str, problem: str, entry: CacheEntry):
+        data = (
+            zlib.compress(
+                json.dumps([sample.to_json() for sample in entry.samples]).encode(
+                    "utf-8"
+                )
+            )
+            if entry.samples is not None
+            else None
+        )
+
+        with contextlib.closing(self._connect()) as db, db:
+            db.execute(
+                "INSERT OR REPLACE INTO samples VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source,
+                    problem,
+                    data,
+                    len(data) if data is not None else 0,
+                    entry.fetched_at,
+                    time.time(),
+                    entry.etag,
+                    entry.last_modified,
+                ),
+            )
+            self._evict(db)
+
+    def touch(self, source: str, problem: str, fetched_at: float | None = None):
+        """Mark an entry as just fetched, after revalidating it, or as fetched
+        at the given time."""
+        if fetched_at is None:
+            fetched_at = time.time()
+        with contextlib.closing(self._connect()) as db, db:
+            db.execute(
+                "UPDATE samples SET fetched_at = ? WHERE source = ? AND problem = ?",
+                (fetched_at, source, problem),
+            )
+
+    def _evict(self, db: sqlite3.Connection):
+        (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM samples").fetchone()
+        if total <= self.max_size:
+            return
+
+        rows = db.execute(
+            "SELECT source, problem, size FROM samples ORDER BY accessed_at"
+        ).fetchall()
+        for source, problem, size in rows:
+            if total <= self.max_size:
+                break
+            db.execute(
+                "DELETE FROM samples WHERE source = ? AND problem = ?",
+                (source, problem),
+            )
+            total -= size
+
+
+def _set_up(db: sqlite3.Connection):
+    """Create the tables, the journal mode is stored in the database too."""
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute(
+        """
+        CREATE TABLE IF NOT EXISTS samples (
+            source TEXT NOT NULL,
+            problem TEXT NOT NULL,
+            data BLOB,
+            size INTEGER NOT NULL,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            PRIMARY KEY (source, problem)
+        )
+        """
+    )
+    db.execute(
+        "CREATE INDEX IF NOT EXISTS samples_accessed_at ON samples (accessed_at)"
+    )
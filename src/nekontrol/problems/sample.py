@@ -1,22 +1,109 @@
-from dataclasses import dataclass
+import hashlib
+from os import path
 from typing import Any
 
+_CHUNK_SIZE = 1024 * 1024
+
 
-@dataclass(frozen=True, eq=True)
 class ProblemSample:
     """A sample for a problem.
 
-    Contains the input data and maybe also the expected output
+    Contains the input data and maybe also the expected output. A sample can
+    be backed by files instead, then only the paths are kept and the data is
+    read every time it is used, so that large test data is never held in
+    memory for longer than needed.
     """
 
     name: str
     """The name of the source"""
     source: str
     """An explaining source for the problem sample"""
-    input: str
-    """The input data"""
-    output: str | None
-    """The output data"""
+    input_path: str | None
+    """The file the input data is read from, if it is backed by a file"""
+    output_path: str | None
+    """The file the output data is read from, if it is backed by a file"""
+
+    def __init__(
+        self,
+        name: str,
+        source: str,
+        input: str | None = None,
+        output: str | None = None,
+        input_path: str | None = None,
+        output_path: str | None = None,
+    ):
+        assert input is not None or input_path is not None
+        self.name = name
+        self.source = source
+        self._input = input
+        self._output = output
+        self.input_path = input_path
+        self.output_path = output_path
+        self._digest: str | None = None
+
+    @staticmethod
+    def from_files(
+        name: str, source: str, input_path: str, output_path: str | None
+    ) -> "ProblemSample":
+        return ProblemSample(
+            name=name, source=source, input_path=input_path, output_path=output_path
+        )
+
+    @property
+    def input(self) -> str:
+        """The input data"""
+        if self._input is not None:
+            return self._input
+        assert self.input_path is not None
+        return _read(self.input_path)
+
+    @property
+    def output(self) -> str | None:
+        """The output data"""
+        if self._output is not None:
+            return self._output
+        if self.output_path is not None:
+            return _read(self.output_path)
+        return None
+
+    @property
+    def has_output(self) -> bool:
+        """If there is output data, without reading it"""
+        return self._output is not None or self.output_path is not None
+
+    @property
+    def size(self) -> int:
+        """The size of the input data in bytes"""
+        if self._input is not None:
+            return len(self._input.encode("utf-8"))
+        assert self.input_path is not None
+        return path.getsize(self.input_path)
+
+    @property
+    def digest(self) -> str:
+        """A hash of the input and output data, read in chunks from files"""
+        if self._digest is None:
+            h = hashlib.sha256()
+            h.update(_hash_text(self._input, self.input_path))
+            if self.has_output:
+                h.update(_hash_text(self._output, self.output_path))
+            self._digest = h.hexdigest()
+        return self._digest
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ProblemSample):
+            return NotImplemented
+        return (self.name, self.source, self.digest) == (
+            other.name,
+            other.source,
+            other.digest,
+        )
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.source, self.digest))
+
+    def __repr__(self) -> str:
+        return f"ProblemSample(name={self.name!r}, source={self.source!r})"
 
     @staticmethod
     def from_json(obj: Any) -> "ProblemSample":
@@ -24,7 +111,8 @@ class ProblemSample:
         source = obj["source"]
         input = obj["input"]
         output = obj["output"]
-        assert all(isinstance(v, str) for v in [name, source, input, output])
+        assert all(isinstance(v, str) for v in [name, source, input])
+        assert output is None or isinstance(output, str)
         return ProblemSample(name=name, source=source, input=input, output=output)
 
     def to_json(self) -> Any:
@@ -34,3 +122,21 @@ class ProblemSample:
             "input": self.input,
             "output": self.output,
         }
+
+
+def _read(file_path: str) -> str:
+    with open(file_path) as f:
+        return f.read()
+
+
+def _hash_text(text: str | None, file_path: str | None) -> bytes:
+    # Files are hashed as the text they decode to, so that a sample backed by
+    # a file is equal to one with the same data in memory
+    h = hashlib.sha256()
+    if text is not None:
+        h.update(text.encode("utf-8"))
+    elif file_path is not None:
+        with open(file_path) as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                h.update(chunk.encode("utf-8"))
+    return h.digest()
@@ -1,13 +1,11 @@
-import json
-import os
+import time
 from abc import ABC
-from os import path
-
-import appdirs
+from dataclasses import dataclass
 
 from nekontrol.config import Config
 from nekontrol.interactive.tasks import TaskContext
 
+from .cache import CacheEntry, SampleStore
 from .sample import ProblemSample
 
 
@@ -24,52 +22,140 @@ class ProblemSource(ABC):
         raise NotImplementedError()
 
 
-class CachedProblemSource(ProblemSource):
-    def cache_dir(self) -> str:
-        cache_dir = appdirs.user_cache_dir("nekontrol")
-        source_cache_dir = path.join(cache_dir, "sources", self.source_name)
-        return source_cache_dir
+@dataclass
+class Fetched:
+    """Samples fetched from a source, possibly conditionally."""
 
-    def write_cached_samples(self, problem: str, samples: list[ProblemSample]):
-        cd = self.cache_dir()
-        json_path = path.join(cd, f"{problem}.json")
+    samples: list[ProblemSample] | None
+    """The samples, None if there were none or fetching them failed"""
+    not_modified: bool = False
+    """If the cached samples that were revalidated are still valid"""
+    etag: str | None = None
+    last_modified: str | None = None
 
-        j = [sample.to_json() for sample in samples]
 
-        if not path.exists(cd):
-            os.makedirs(cd)
-        with open(json_path, "w+") as f:
-            f.write(json.dumps(j))
+class CachedProblemSource(ProblemSource):
+    """A source that caches its samples in a SampleStore.
 
-    def read_cached_samples(self, problem: str) -> list[ProblemSample] | None:
-        cd = self.cache_dir()
+    Cached samples are used for cfg.sample_cache_ttl seconds, after which
+    they are revalidated. Failures to fetch samples are remembered for
+    cfg.sample_cache_failure_ttl seconds.
+    """
 
-        json_path = path.join(cd, f"{problem}.json")
+    def store(self, cfg: Config) -> SampleStore:
+        return SampleStore(SampleStore.default_path(), cfg.sample_cache_size)
 
-        if not path.exists(json_path):
-            return None
+    def find_problem(
+        self,
+        problem: str,
+        source_dir: str,
+        cfg: Config,
+        tctx: TaskContext | None = None,
+    ) -> list[ProblemSample]:
+        store = self.store(cfg)
+        entry = store.get(self.source_name, problem)
 
-        with open(json_path, "r") as f:
-            j = json.loads(f.read())
-        samples = [ProblemSample.from_json(o) for o in j]
-        return samples
+        if entry is not None and _is_fresh(entry, cfg):
+            return entry.samples or []
 
-    def find_problem(
+        return self._refresh(problem, source_dir, cfg, store, entry, tctx=tctx)
+
+    def is_fresh(self, problem: str, cfg: Config) -> bool:
+        """If samples for the problem are cached and don't need fetching."""
+        entry = self.store(cfg).get(self.source_name, problem)
+        return entry is not None and entry.samples is not None and _is_fresh(entry, cfg)
+
+    def update_cache(
         self,
         problem: str,
         source_dir: str,
         cfg: Config,
         tctx: TaskContext | None = None,
+        revalidate: bool = True,
     ) -> list[ProblemSample]:
-        cached = self.read_cached_samples(problem)
+        """Fetch the samples, regardless of their age, and cache them.
 
-        if cached is not None:
-            return cached
+        If revalidate is set, the cached samples are only downloaded again
+        if they have changed.
+        """
+        store = self.store(cfg)
+        entry = store.get(self.source_name, problem) if revalidate else None
+        return self._refresh(problem, source_dir, cfg, store, entry, tctx=tctx)
 
-        uncached = self.find_uncached(problem, source_dir, cfg, tctx=tctx)
-        self.write_cached_samples(problem, uncached)
+    def _refresh(
+        self,
+        problem: str,
+        source_dir: str,
+        cfg: Config,
+        store: SampleStore,
+        entry: CacheEntry | None,
+        tctx: TaskContext | None = None,
+    ) -> list[ProblemSample]:
+        stale = entry if entry is not None and entry.samples is not None else None
+
+        try:
+            fetched = self.fetch(
+                problem,
+                source_dir,
+                cfg,
+                etag=stale.etag if stale else None,
+                last_modified=stale.last_modified if stale else None,
+                tctx=tctx,
+            )
+        except Exception:
+            # Remember the failure, so that it isn't retried (with the backoff
+            # of the requests) on every run while offline
+            if stale is not None and stale.samples is not None:
+                # Stale samples are better than none, they are used until
+                # fetching is tried again in sample_cache_failure_ttl seconds
+                retry_at = time.time() + cfg.sample_cache_failure_ttl
+                store.touch(
+                    self.source_name,
+                    problem,
+                    fetched_at=max(stale.fetched_at, retry_at - cfg.sample_cache_ttl),
+                )
+                return stale.samples
+            store.put(
+                self.source_name,
+                problem,
+                CacheEntry(samples=None, fetched_at=time.time()),
+            )
+            raise
+
+        if stale is not None and stale.samples is not None:
+            if fetched.not_modified:
+                store.touch(self.source_name, problem)
+                return stale.samples
+            if fetched.samples is None:
+                return stale.samples
+
+        store.put(
+            self.source_name,
+            problem,
+            CacheEntry(
+                samples=fetched.samples,
+                fetched_at=time.time(),
+                etag=fetched.etag,
+                last_modified=fetched.last_modified,
+            ),
+        )
+        return fetched.samples or []
+
+    def fetch(
+        self,
+        problem: str,
+        source_dir: str,
+        cfg: Config,
+        etag: str | None = None,
+        last_modified: str | None = None,
+        tctx: TaskContext | None = None,
+    ) -> Fetched:
+        """Fetch the samples, unless they match the given validators.
 
-        return uncached
+        Sources that don't support conditional fetching fetch everything.
+        """
+        samples = self.find_uncached(problem, source_dir, cfg, tctx=tctx)
+        return Fetched(samples=samples or None)
 
     def find_uncached(
         self,
@@ -79,3 +165,9 @@ class CachedProblemSource(ProblemSource):
         tctx: TaskContext | None = None,
     ) -> list[ProblemSample]:
         raise NotImplementedError()
+
+
+def _is_fresh(entry: CacheEntry, cfg: Config) -> bool:
+    if entry.samples is None:
+        return entry.age() < cfg.sample_cache_failure_ttl
+    return entry.age() < cfg.sample_cache_ttl
@@ -1,39 +1,88 @@
-import shutil
-import tempfile
+import io
 import zipfile
 
-import requests
-
 from nekontrol.config import Config
 
 from ...interactive.tasks import TaskContext
 from ..sample import ProblemSample
-from ..source import CachedProblemSource
-from .local import find_local_sources
+from ..source import CachedProblemSource, Fetched
+
+
+def samples_from_zip(zip: zipfile.ZipFile, source: str) -> list[ProblemSample]:
+    """Read .in and .ans pairs from a zip file without extracting it.
+
+    The samples are named by their path in the zip file, so that inputs with
+    the same name in different folders are all kept.
+    """
+    files = {info.filename: info for info in zip.infolist() if not info.is_dir()}
+
+    def read(name: str) -> str:
+        # Decode like open() does for local files, with universal newlines
+        with io.TextIOWrapper(zip.open(files[name]), encoding="utf-8") as f:
+            return f.read()
+
+    samples = []
+    for name in files:
+        if not name.endswith(".in"):
+            continue
+
+        answer_name = name.removesuffix(".in") + ".ans"
+        samples.append(
+            ProblemSample(
+                name=name,
+                source=source,
+                input=read(name),
+                output=read(answer_name) if answer_name in files else None,
+            )
+        )
+
+    return samples
 
 
 class KattisSource(CachedProblemSource):
     source_name = "Kattis"
 
-    def find_uncached(
+    def fetch(
         self,
         problem: str,
         source_dir: str,
         cfg: Config,
+        etag: str | None = None,
+        last_modified: str | None = None,
         tctx: TaskContext | None = None,
-    ) -> list[ProblemSample]:
+    ) -> Fetched:
         url = f"https://open.kattis.com/problems/{problem}/file/statement/samples.zip"
-        with requests.get(url, stream=True) as response:
-            if not response.ok:
-                # TODO: Maybe we should report that we couldn't fetch anything
-                return []
 
-            with tempfile.TemporaryFile("w+b") as f:
-                shutil.copyfileobj(response.raw, f)
-                f.seek(0)
-                zip = zipfile.ZipFile(f)
+        headers = {}
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
 
-                with tempfile.TemporaryDirectory() as d:
-                    zip.extractall(d)
+        # Imported here, requests is slow to import and rarely needed once the
+        # samples are cached
+        from nekontrol.http_session import session
 
-                    return find_local_sources(lambda _: True, d, "Kattis")
+        response = session().get(url, headers=headers, timeout=cfg.fetch_timeout)
+        if response.status_code == 304:
+            return Fetched(samples=None, not_modified=True)
+        if not response.ok:
+            return Fetched(samples=None)
+
+        with zipfile.ZipFile(io.BytesIO(response.content)) as zip:
+            samples = samples_from_zip(zip, "Kattis")
+
+        return Fetched(
+            samples=samples or None,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+    def find_uncached(
+        self,
+        problem: str,
+        source_dir: str,
+        cfg: Config,
+        tctx: TaskContext | None = None,
+    ) -> list[ProblemSample]:
+        return self.fetch(problem, source_dir, cfg, tctx=tctx).samples or []
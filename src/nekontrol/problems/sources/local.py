@@ -1,7 +1,12 @@
+import hashlib
+import json
 import os
-import re
+import time
+from fnmatch import fnmatchcase
 from os import path
-from typing import Callable
+from typing import Any
+
+import appdirs
 
 from nekontrol.config import Config
 from nekontrol.problems.sample import ProblemSample
@@ -10,35 +15,204 @@ from ...interactive.tasks import TaskContext
 from ..source import ProblemSource
 
 
-def find_local_sources(filter: Callable[[str], bool], source_dir: str, source: str):
+def _split(pattern: str, problem: str) -> list[str]:
+    return [part for part in pattern.format(problem=problem).split("/") if part]
+
+
+def _matches(parts: list[str], pattern: list[str]) -> bool:
+    """If a relative path matches a glob pattern, where ** is any number of
+    directories and the other wildcards don't match /."""
+    if not pattern:
+        return not parts
+    if pattern[0] == "**":
+        return any(_matches(parts[i:], pattern[1:]) for i in range(len(parts) + 1))
+    return (
+        bool(parts)
+        and fnmatchcase(parts[0], pattern[0])
+        and _matches(parts[1:], pattern[1:])
+    )
+
+
+def _may_contain(parts: list[str], pattern: list[str]) -> bool:
+    """If files in a directory at a relative path can match a glob pattern."""
+    if not pattern:
+        return False
+    if not parts:
+        return True
+    if pattern[0] == "**":
+        return True
+    return (
+        len(pattern) > 1
+        and fnmatchcase(parts[0], pattern[0])
+        and _may_contain(parts[1:], pattern[1:])
+    )
+
+
+def sample_dirs(problem: str, source_dir: str, patterns: list[str]) -> list[str]:
+    """The existing subdirectories of source_dir that samples can be found in,
+    below the fixed leading directories of the patterns."""
+    dirs = []
+    for pattern in patterns:
+        parts = _split(pattern, problem)[:-1]
+        fixed = []
+        for part in parts:
+            if any(c in part for c in "*?["):
+                break
+            fixed.append(part)
+
+        if fixed and path.isdir(path.join(source_dir, *fixed)):
+            dirs.append(path.join(source_dir, *fixed))
+
+    return dirs
+
+
+def is_sample_file(file: str, problem: str, source_dir: str, patterns: list[str]):
+    """If a file is an input or answer that the patterns find."""
+    relative = path.relpath(file, source_dir)
+    if relative.startswith(os.pardir):
+        return False
+
+    stem, extension = path.splitext(relative)
+    if extension not in (".in", ".ans"):
+        return False
+
+    parts = (stem + ".in").split(os.sep)
+    return any(_matches(parts, _split(p, problem)) for p in patterns)
+
+
+# Directories modified this recently when they were scanned may change again
+# without their modification time changing, on file systems with coarse
+# timestamps, so an index with them isn't stored
+_MTIME_GRANULARITY_NS = 2 * 10**9
+
+
+def _scan(
+    source_dir: str, problem: str, patterns: list[list[str]]
+) -> tuple[dict[str, int], list[tuple[str, str | None]]]:
+    """Find the inputs matching the patterns and their answers, in a single
+    pass over the directories that may contain them.
+
+    Returns the modification times of the scanned directories, and the pairs
+    of inputs and answers as paths relative to source_dir."""
+    mtimes: dict[str, int] = {}
+    pairs: list[tuple[str, str | None]] = []
+
+    def scan(relative: list[str]):
+        dir = path.join(source_dir, *relative)
+        try:
+            # Before reading the entries, so files added while scanning make
+            # the result stale
+            mtimes[path.relpath(dir, source_dir)] = os.stat(dir).st_mtime_ns
+            entries = list(os.scandir(dir))
+        except OSError:
+            return
+
+        # Inputs and answers with the same stem, by stem
+        files: dict[str, dict[str, str]] = {}
+        for entry in entries:
+            parts = relative + [entry.name]
+            if entry.is_dir():
+                if not entry.name.startswith(".") and any(
+                    _may_contain(parts, p) for p in patterns
+                ):
+                    scan(parts)
+                continue
+
+            stem, extension = path.splitext(entry.name)
+            if extension in (".in", ".ans"):
+                files.setdefault(stem, {})[extension] = path.join(*parts)
+
+        for stem, pair in files.items():
+            input = pair.get(".in")
+            if input is not None and any(
+                _matches(relative + [stem + ".in"], p) for p in patterns
+            ):
+                pairs.append((input, pair.get(".ans")))
+
+    scan([])
+    pairs.sort()
+    return mtimes, pairs
+
+
+class _LocalIndex:
+    """Inputs and answers found for a problem, stored in the cache directory
+    and reused until one of the scanned directories is modified."""
+
+    def __init__(self, source_dir: str, problem: str, patterns: list[str]):
+        self.source_dir = path.abspath(source_dir)
+        self.problem = problem
+        self.patterns = patterns
+
+        key = json.dumps([self.source_dir, problem, patterns])
+        self.cache_path = path.join(
+            appdirs.user_cache_dir("nekontrol"),
+            "local",
+            hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json",
+        )
+
+    def _load(self) -> list[tuple[str, str | None]] | None:
+        try:
+            with open(self.cache_path) as f:
+                index: Any = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        for relative, mtime in index["mtimes"].items():
+            try:
+                if os.stat(path.join(self.source_dir, relative)).st_mtime_ns != mtime:
+                    return None
+            except OSError:
+                return None
+
+        return [(input, answer) for input, answer in index["pairs"]]
+
+    def _store(self, mtimes: dict[str, int], pairs: list[tuple[str, str | None]]):
+        os.makedirs(path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"mtimes": mtimes, "pairs": pairs}, f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            pass
+
+    def pairs(self) -> list[tuple[str, str | None]]:
+        pairs = self._load()
+        if pairs is None:
+            scanned_at = time.time_ns()
+            mtimes, pairs = _scan(
+                self.source_dir,
+                self.problem,
+                [_split(p, self.problem) for p in self.patterns],
+            )
+            if all(
+                mtime < scanned_at - _MTIME_GRANULARITY_NS for mtime in mtimes.values()
+            ):
+                self._store(mtimes, pairs)
+        return pairs
+
+
+def find_local_sources(
+    problem: str, source_dir: str, source: str, patterns: list[str]
+) -> list[ProblemSample]:
     """
-    filter: Filter by (file_name)
+    patterns: Globs for the inputs relative to source_dir, where {problem} is
+    replaced by the problem name and ** is any number of directories. The
+    answer of an input is the file with the same name ending in .ans.
+
+    The samples are backed by the files, which are not read until used.
     """
-    samples: list[ProblemSample] = []
-
-    for file in os.listdir(source_dir):
-        if filter(file) and file.endswith(".in"):
-            input_path = path.join(source_dir, file)
-
-            with open(input_path) as f:
-                input = f.read()
-
-            output = None
-            output_path = re.sub(r".in$", ".ans", input_path)
-            if path.exists(output_path):
-                with open(path.join(source_dir, output_path)) as f:
-                    output = f.read()
-
-            samples.append(
-                ProblemSample(
-                    name=path.basename(file),
-                    source=source,
-                    input=input,
-                    output=output,
-                )
-            )
+    pairs = _LocalIndex(source_dir, problem, patterns).pairs()
 
-    return samples
+    return [
+        ProblemSample.from_files(
+            name=input,
+            source=source,
+            input_path=path.join(source_dir, input),
+            output_path=path.join(source_dir, answer) if answer is not None else None,
+        )
+        for input, answer in pairs
+    ]
 
 
 class LocalSource(ProblemSource):
@@ -51,6 +225,4 @@ class LocalSource(ProblemSource):
         cfg: Config,
         tctx: TaskContext | None = None,
     ) -> list[ProblemSample]:
-        return find_local_sources(
-            lambda fname: fname.startswith(problem), source_dir, "Local"
-        )
+        return find_local_sources(problem, source_dir, "Local", cfg.sample_patterns)
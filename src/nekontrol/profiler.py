@@ -0,0 +1,284 @@
+"""Profiling solutions with the profiler of their language.
+
+Each profiler runs a prepared language on an input and returns the functions
+the time was spent in, the hotspots. Compiled languages are built with the
+flags of their profiler, see Config.extra_flags.
+"""
+
+import collections
+import glob
+import json
+import re
+import tempfile
+from dataclasses import dataclass, field
+from os import path
+from typing import ClassVar
+
+from click import ClickException
+
+from . import util
+from .language import (
+    Cpp,
+    FileInput,
+    Haskell,
+    JSNode,
+    Language,
+    Limits,
+    Python,
+    RunResult,
+    Rust,
+    find_bin,
+    generic_run,
+)
+
+
+@dataclass
+class Hotspot:
+    name: str
+    self_fraction: float
+    """The fraction of the time spent in the function itself"""
+    total_fraction: float | None = None
+    """The fraction of the time spent in the function and what it calls"""
+    location: str | None = None
+
+
+@dataclass
+class Profile:
+    result: RunResult
+    """The result of the profiled run"""
+    hotspots: list[Hotspot]
+    """The hotspots, the most expensive first"""
+
+
+@dataclass
+class Profiler:
+    name: ClassVar[str]
+    flags: list[str] = field(default_factory=list)
+    """Compiler flags the language must be built with to be profiled"""
+
+    def profile(self, lang: Language, input: str | FileInput) -> Profile:
+        raise NotImplementedError()
+
+    def _failed(self, result: RunResult) -> ClickException:
+        """The error for a run that the profiler wrote no profile for."""
+        return ClickException(
+            f"{self.name} wrote no profile, the run exited with code {result.exit}"
+            + (" and stderr:\n" + util.indented(result.stderr) if result.stderr else "")
+        )
+
+
+def _ranked(hotspots: list[Hotspot]) -> list[Hotspot]:
+    return sorted(hotspots, key=lambda h: h.self_fraction, reverse=True)
+
+
+# Runs the solution as __main__ under cProfile, without profiling how it is
+# loaded, and writes the stats as JSON so that they can be read regardless of
+# the version of the interpreter
+_PYTHON_PROFILE = """
+import cProfile, json, os, sys
+stats_path, source = sys.argv[1], sys.argv[2]
+sys.argv = [source]
+sys.path[0] = os.path.dirname(os.path.abspath(source))
+with open(source, "rb") as f:
+    code = compile(f.read(), source, "exec")
+main = {"__name__": "__main__", "__file__": source, "__builtins__": __builtins__}
+profile = cProfile.Profile()
+try:
+    profile.runctx(code, main, main)
+except SystemExit:
+    pass
+finally:
+    profile.create_stats()
+    sys.stdout.flush()
+    stats = [list(func) + list(stat[:4]) for func, stat in profile.stats.items()]
+    with open(stats_path, "w") as f:
+        json.dump(stats, f)
+"""
+
+
+class PythonProfiler(Profiler):
+    name = "cProfile"
+
+    def profile(self, lang: Language, input: str | FileInput) -> Profile:
+        assert isinstance(lang, Python)
+
+        with tempfile.TemporaryDirectory(prefix="nk-profile-") as d:
+            stats_path = path.join(d, "stats.json")
+            result = generic_run(
+                [lang.bin, "-c", _PYTHON_PROFILE, stats_path, lang.source_file],
+                input,
+                Limits(),
+            )
+
+            if not path.exists(stats_path):
+                raise self._failed(result)
+            with open(stats_path) as f:
+                stats = json.load(f)
+
+        # file, line, function, primitive calls, calls, own time, total time
+        total = sum(s[5] for s in stats) or 1.0
+        hotspots = [
+            Hotspot(
+                name=function,
+                self_fraction=own / total,
+                total_fraction=cumulative / total,
+                location=f"{path.basename(file)}:{line}" if line else None,
+            )
+            for file, line, function, _, _, own, cumulative in stats
+            # The profiling of the profiler
+            if not function.startswith("<method 'disable'")
+        ]
+        return Profile(result, _ranked(hotspots))
+
+
+class PerfProfiler(Profiler):
+    name = "perf"
+
+    def profile(self, lang: Language, input: str | FileInput) -> Profile:
+        assert isinstance(lang, Cpp | Rust)
+
+        perf = find_bin(["perf"])
+        if perf is None:
+            raise ClickException("perf is needed to profile, but was not found")
+
+        with tempfile.TemporaryDirectory(prefix="nk-profile-") as d:
+            data_path = path.join(d, "perf.data")
+            result = generic_run(
+                [perf, "record", "-q", "-g", "-o", data_path, lang.compiled_output],
+                input,
+                Limits(),
+            )
+
+            if not path.exists(data_path):
+                raise self._failed(result)
+
+            report = generic_run(
+                [perf, "report", "-i", data_path, "--stdio", "--no-children"]
+                + ["--sort", "symbol", "-g", "none"],
+                "",
+            )
+            if report.exit != 0:
+                raise ClickException(
+                    f"perf report failed:\n{util.indented(report.stderr)}"
+                )
+
+        return Profile(result, parse_perf_report(report.stdout))
+
+
+_perf_line = re.compile(r"^\s*([\d.]+)%\s+\[[.k]\]\s+(.+?)\s*$")
+
+
+def parse_perf_report(report: str) -> list[Hotspot]:
+    """Parse the output of perf report --stdio --sort symbol."""
+    hotspots = []
+    for line in report.splitlines():
+        if (m := _perf_line.match(line)) is not None:
+            hotspots.append(Hotspot(name=m[2], self_fraction=float(m[1]) / 100))
+    return _ranked(hotspots)
+
+
+class GhcProfiler(Profiler):
+    name = "GHC profiling"
+
+    def profile(self, lang: Language, input: str | FileInput) -> Profile:
+        assert isinstance(lang, Haskell)
+
+        with tempfile.TemporaryDirectory(prefix="nk-profile-") as d:
+            stem = path.join(d, "profile")
+            result = generic_run(
+                [lang.compiled_output, "+RTS", "-p", f"-po{stem}", "-RTS"],
+                input,
+                Limits(),
+            )
+
+            if not path.exists(stem + ".prof"):
+                raise self._failed(result)
+            with open(stem + ".prof") as f:
+                return Profile(result, parse_ghc_profile(f.read()))
+
+
+def parse_ghc_profile(profile: str) -> list[Hotspot]:
+    """Parse the flat cost centre table of a GHC .prof file.
+
+    Its rows are the cost centre, the module, the source location (on newer
+    GHCs), %time and %alloc.
+    """
+    lines = iter(profile.splitlines())
+    if not any(line.startswith("COST CENTRE") for line in lines):
+        return []
+
+    hotspots = []
+    for line in lines:
+        columns = line.split()
+        if not columns:
+            # The table starts after a blank line, and ends with one
+            if hotspots:
+                break
+            continue
+
+        hotspots.append(
+            Hotspot(
+                name=f"{columns[1]}.{columns[0]}",
+                self_fraction=float(columns[-2]) / 100,
+                location=" ".join(columns[2:-2]) or None,
+            )
+        )
+    return _ranked(hotspots)
+
+
+class NodeProfiler(Profiler):
+    name = "node --cpu-prof"
+
+    def profile(self, lang: Language, input: str | FileInput) -> Profile:
+        assert isinstance(lang, JSNode)
+
+        with tempfile.TemporaryDirectory(prefix="nk-profile-") as d:
+            result = generic_run(
+                [lang.bin, "--cpu-prof", "--cpu-prof-dir", d, lang.source_file],
+                input,
+                Limits(),
+            )
+
+            profile_paths = glob.glob(path.join(d, "*.cpuprofile"))
+            if not profile_paths:
+                raise self._failed(result)
+            with open(profile_paths[0]) as f:
+                return Profile(result, parse_cpu_profile(json.load(f)))
+
+
+def parse_cpu_profile(profile: dict) -> list[Hotspot]:
+    """Sum the samples of a V8 .cpuprofile by function."""
+    nodes = {node["id"]: node for node in profile["nodes"]}
+    samples = collections.Counter(profile["samples"])
+    total = sum(samples.values()) or 1
+
+    by_function: collections.Counter[tuple[str, str | None]] = collections.Counter()
+    for node_id, count in samples.items():
+        frame = nodes[node_id]["callFrame"]
+        name = frame["functionName"] or "(anonymous)"
+        if name == "(idle)":
+            continue
+        location = (
+            f"{path.basename(frame['url'])}:{frame['lineNumber'] + 1}"
+            if frame.get("url")
+            else None
+        )
+        by_function[name, location] += count
+
+    return _ranked(
+        [
+            Hotspot(name=name, self_fraction=count / total, location=location)
+            for (name, location), count in by_function.items()
+        ]
+    )
+
+
+profilers: dict[type[Language], Profiler] = {
+    Python: PythonProfiler(),
+    # Symbols and frame pointers, so that perf can tell where time is spent
+    Cpp: PerfProfiler(["-g", "-fno-omit-frame-pointer"]),
+    Rust: PerfProfiler(["-g", "-C", "force-frame-pointers=yes"]),
+    Haskell: GhcProfiler(["-prof", "-fprof-auto", "-rtsopts"]),
+    JSNode: NodeProfiler(),
+}
+"""The profilers by language"""
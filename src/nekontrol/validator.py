@@ -0,0 +1,100 @@
+import os
+import tempfile
+from dataclasses import dataclass
+from os import path
+
+from . import util
+from .checker import DebugFilter
+from .language import FileInput, Runnable, RunResult
+from .problems.sample import ProblemSample
+
+# Exit codes of output validators in the Kattis problem package format
+ACCEPTED = 42
+WRONG_ANSWER = 43
+
+
+@dataclass
+class Validation:
+    accepted: bool
+    feedback: str
+    """The judge message of the validator, or why it failed"""
+    debug_lines: int = 0
+    """The number of lines with debug output hidden from the validator"""
+
+
+class OutputValidator:
+    """A compiled output validator program.
+
+    It is invoked as in the Kattis problem package format:
+    `validator input_file answer_file feedback_dir < output`, and exits with
+    42 if the output is accepted and 43 if it is not.
+    """
+
+    def __init__(
+        self,
+        runnable: Runnable,
+        ignore_debug: bool = True,
+        ignore_inline_debug: bool = False,
+    ):
+        self.runnable = runnable
+        self.ignore_debug = ignore_debug
+        self.ignore_inline_debug = ignore_inline_debug
+
+    def validate(self, sample: ProblemSample, result: RunResult) -> Validation:
+        assert sample.has_output
+
+        with tempfile.TemporaryDirectory(prefix="nk-validator-") as d:
+            input_path = sample.input_path or _write(d, "input", sample.input)
+            answer_path = sample.output_path or _write(d, "answer", sample.output or "")
+            feedback_dir = path.join(d, "feedback")
+            os.mkdir(feedback_dir)
+
+            debug_filter = DebugFilter(inline=self.ignore_inline_debug)
+            output: str | FileInput
+            if self.ignore_debug:
+                output = FileInput(path.join(d, "output"))
+                with result.open_stdout() as src, open(output.path, "w") as dst:
+                    dst.writelines(debug_filter.filter(src))
+            elif result.stdout_path is not None:
+                output = FileInput(result.stdout_path)
+            else:
+                output = result.stdout
+
+            validator_result = self.runnable.run(
+                output, [input_path, answer_path, feedback_dir + os.sep]
+            )
+            try:
+                judge_message_path = path.join(feedback_dir, "judgemessage.txt")
+                judge_message = ""
+                if path.exists(judge_message_path):
+                    with open(judge_message_path, errors="replace") as f:
+                        judge_message = f.read().rstrip()
+            finally:
+                # Only the exit code and stderr are used, not the spooled stdout
+                validator_result.cleanup()
+
+        exit = validator_result.exit
+        if exit == ACCEPTED:
+            return Validation(True, judge_message, debug_filter.debug_lines)
+        elif exit == WRONG_ANSWER:
+            return Validation(
+                False, judge_message or "Wrong answer", debug_filter.debug_lines
+            )
+        else:
+            return Validation(
+                False,
+                f"Validator exited with code {exit}"
+                + (
+                    " and stderr:\n" + util.indented(validator_result.stderr)
+                    if validator_result.stderr
+                    else ""
+                ),
+                debug_filter.debug_lines,
+            )
+
+
+def _write(dir: str, name: str, content: str) -> str:
+    file_path = path.join(dir, name)
+    with open(file_path, "w") as f:
+        f.write(content)
+    return file_path
@@ -0,0 +1,189 @@
+"""Waiting for files to change, with inotify on Linux and polling elsewhere."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from os import path
+
+# From sys/inotify.h
+_IN_MODIFY = 0x2
+_IN_CLOSE_WRITE = 0x8
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+)
+_EVENT = struct.Struct("iIII")
+
+POLL_INTERVAL = 0.25
+"""Seconds between checking for changes when inotify is not available"""
+SETTLE_TIME = 0.05
+"""Seconds to keep collecting changes after the first one
+
+Editors often save by writing several files or renaming a temporary file,
+this groups all of those changes together.
+"""
+
+
+class Watcher:
+    """Watches directories for files that are written, created or removed.
+
+    Directories are watched recursively if asked to, otherwise only the
+    files directly in them are watched.
+    """
+
+    def __init__(self, dirs: list[tuple[str, bool]]):
+        self.dirs = [(path.abspath(d), recursive) for d, recursive in dirs]
+        self._fd: int | None = None
+        self._wds: dict[int, str] = {}
+
+        libc = _libc()
+        if libc is not None:
+            fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+            if fd >= 0:
+                self._libc = libc
+                self._fd = fd
+
+        if self._fd is not None:
+            for dir, recursive in self.dirs:
+                self._add_watches(dir, recursive)
+        else:
+            self._snapshot = self._scan()
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def wait(self) -> set[str]:
+        """Block until something changes, returns the paths that changed."""
+        changed = self._wait(None)
+        while True:
+            more = self._wait(SETTLE_TIME)
+            if not more:
+                return changed
+            changed |= more
+
+    def _wait(self, timeout: float | None) -> set[str]:
+        if self._fd is not None:
+            return self._wait_inotify(timeout)
+        else:
+            return self._wait_polling(timeout)
+
+    def _add_watches(self, dir: str, recursive: bool):
+        assert self._fd is not None
+        dirs = [dir]
+        if recursive:
+            dirs += [root for root, _, _ in os.walk(dir)][1:]
+
+        for d in dirs:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(d), _WATCH_MASK)
+            if wd >= 0:
+                self._wds[wd] = d
+
+    def _is_recursive(self, dir: str) -> bool:
+        return any(
+            recursive and (dir == d or dir.startswith(d + os.sep))
+            for d, recursive in self.dirs
+        )
+
+    def _wait_inotify(self, timeout: float | None) -> set[str]:
+        assert self._fd is not None
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        try:
+            buf = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, name_len = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + name_len].rstrip(b"\0")
+            offset += name_len
+
+            dir = self._wds.get(wd)
+            if dir is None:
+                continue
+
+            file_path = path.join(dir, os.fsdecode(name))
+            changed.add(file_path)
+
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+                if self._is_recursive(dir):
+                    self._add_watches(file_path, True)
+
+        return changed
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = {}
+        for dir, recursive in self.dirs:
+            if recursive:
+                files = (
+                    path.join(root, file)
+                    for root, _, files in os.walk(dir)
+                    for file in files
+                )
+            else:
+                files = (entry.path for entry in os.scandir(dir) if entry.is_file())
+
+            for file in files:
+                try:
+                    stat = os.stat(file)
+                except FileNotFoundError:
+                    continue
+                snapshot[file] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def _wait_polling(self, timeout: float | None) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            snapshot = self._scan()
+            changed = {
+                file
+                for file in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(file) != self._snapshot.get(file)
+            }
+            self._snapshot = snapshot
+
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+
+            time.sleep(POLL_INTERVAL)
+
+
+def _libc():
+    name = ctypes.util.find_library("c")
+    if name is None:
+        return None
+
+    libc = ctypes.CDLL(name, use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
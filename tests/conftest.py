@@ -0,0 +1,10 @@
+import appdirs
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """Keep caches written by tests out of the user's cache directory."""
+    cache_dir = tmp_path_factory.mktemp("cache")
+    monkeypatch.setattr(appdirs, "user_cache_dir", lambda *_: str(cache_dir))
+    return cache_dir
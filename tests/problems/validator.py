@@ -0,0 +1,11 @@
+import sys
+
+answer = open(sys.argv[2]).read().split()
+output = sys.stdin.read().split()
+
+if output == answer:
+    sys.exit(42)
+
+with open(sys.argv[3] + "judgemessage.txt", "w") as f:
+    f.write(f"expected {' '.join(answer)}")
+sys.exit(43)
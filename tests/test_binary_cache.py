@@ -0,0 +1,155 @@
+import os
+import shutil
+from os import path
+
+import pytest
+from click import ClickException
+
+from nekontrol import cpp_libs
+from nekontrol.binary_cache import BinaryCache, CachedBinary, CachedError
+from nekontrol.config import Config
+from nekontrol.language import CompiledLanguage, CompileError, Cpp
+
+problems_dir = path.join(path.dirname(__file__), "problems")
+
+
+def test_eviction(tmp_path):
+    cache = BinaryCache(str(tmp_path), max_size=10)
+
+    for i, key in enumerate(["a", "b", "c"]):
+        binary = tmp_path / f"bin-{key}"
+        binary.write_bytes(b"xxxx")
+        cache.store_binary(key, str(binary))
+        os.utime(tmp_path / key, (i, i))
+
+    cache.evict()
+
+    assert cache.lookup("a") is None
+    assert isinstance(cache.lookup("b"), CachedBinary)
+    assert isinstance(cache.lookup("c"), CachedBinary)
+
+
+def test_cached_error(tmp_path):
+    cache = BinaryCache(str(tmp_path), max_size=1000)
+    cache.store_error("a", 1, "error")
+
+    assert cache.lookup("a") == CachedError(exit=1, stderr="error")
+
+
+def test_cpp_reuses_binary(monkeypatch):
+    if shutil.which("c++") is None:
+        pytest.skip("no binary for C++ is available")
+
+    source = path.join(problems_dir, "test.cpp")
+
+    with Cpp(source, Config()) as runnable:
+        assert runnable.run("1\n").stdout == "2\n"
+
+    def no_compile(_self):
+        raise AssertionError("compiled despite a cached binary")
+
+    monkeypatch.setattr(Cpp, "compile", no_compile)
+
+    with Cpp(source, Config()) as runnable:
+        assert runnable.run("2\n").stdout == "4\n"
+
+
+def test_cpp_reuses_compile_error(tmp_path, monkeypatch):
+    source = tmp_path / "broken.cpp"
+    source.write_text("int main() { return }")
+
+    compiles = []
+
+    def fail_compile(_self):
+        compiles.append(1)
+        return CompileError(exit=1, stderr="broken")
+
+    monkeypatch.setattr(Cpp, "compile", fail_compile)
+
+    for _ in range(2):
+        with pytest.raises(ClickException):
+            with Cpp(str(source), Config()):
+                pass
+
+    assert len(compiles) == 1
+
+
+def test_lib_objects_rebuild_changed_sources(tmp_path, monkeypatch):
+    if shutil.which("c++") is None:
+        pytest.skip("no binary for C++ is available")
+
+    libs = tmp_path / "libs"
+    libs.mkdir()
+    (libs / "a.cc").write_text("int a() { return 1; }\n")
+    (libs / "b.cc").write_text("int b() { return 2; }\n")
+
+    cache = BinaryCache(str(tmp_path / "cache"), max_size=1 << 30)
+    compiled = []
+    compile_object = cpp_libs._compile_object
+
+    def counting_compile_object(cache, key, compiler, flags, source):
+        compiled.append(path.basename(source))
+        return compile_object(cache, key, compiler, flags, source)
+
+    monkeypatch.setattr(cpp_libs, "_compile_object", counting_compile_object)
+
+    objects = cpp_libs.build_lib_objects(cache, "c++", [], str(libs))
+    assert isinstance(objects, list) and len(objects) == 2
+    assert sorted(compiled) == ["a.cc", "b.cc"]
+
+    (libs / "b.cc").write_text("int b() { return 3; }\n")
+    compiled.clear()
+
+    cpp_libs.build_lib_objects(cache, "c++", [], str(libs))
+    assert compiled == ["b.cc"]
+
+
+def test_eviction_of_directories(tmp_path):
+    cache = BinaryCache(str(tmp_path), max_size=10)
+
+    pch_dir = tmp_path / "a.pch"
+    pch_dir.mkdir()
+    (pch_dir / "header.gch").write_bytes(b"xxxxxxxx")
+    os.utime(pch_dir, (0, 0))
+
+    binary = tmp_path / "bin-b"
+    binary.write_bytes(b"xxxx")
+    cache.store_binary("b", str(binary))
+
+    assert not pch_dir.exists()
+    assert isinstance(cache.lookup("b"), CachedBinary)
+
+
+def test_pinned_entries_are_not_evicted(tmp_path):
+    cache = BinaryCache(str(tmp_path), max_size=1000)
+
+    for i, key in enumerate(["a", "b"]):
+        binary = tmp_path / f"bin-{key}"
+        binary.write_bytes(b"xxxx")
+        cache.store_binary(key, str(binary))
+        os.utime(tmp_path / key, (i, i))
+
+    cache.max_size = 4
+    with cache.pinned(["a"]):
+        cache.evict()
+        assert isinstance(cache.lookup("a"), CachedBinary)
+        assert cache.lookup("b") is None
+
+
+def test_pch_uses_compile_flags(monkeypatch):
+    pch_flags = []
+
+    def build_pch(cache, compiler, flags, header, pins=None):
+        pch_flags.append(flags)
+        return None
+
+    monkeypatch.setattr(cpp_libs, "build_pch", build_pch)
+    monkeypatch.setattr(CompiledLanguage, "compile", lambda _self: CompileError(1, ""))
+
+    config = Config(cpp_pch="bits/stdc++.h", extra_flags={"C++": ["-O2"]})
+    cpp = Cpp("a.cpp", config)
+    cpp.compiled_output = "a.out"
+    cpp.compile()
+
+    assert pch_flags == [["--std=c++17", "-O2"]]
+    assert cpp.compile_cmdline[-1] == "-O2"
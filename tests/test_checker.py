@@ -0,0 +1,46 @@
+from nekontrol.checker import DebugFilter, TokenChecker
+
+
+def check(expected: str, actual: str, **kwargs) -> str | None:
+    return TokenChecker(**kwargs).check(
+        expected.splitlines(keepends=True), actual.splitlines(keepends=True)
+    )
+
+
+def test_whitespace_insensitive():
+    assert check("1 2\n3\n", "1\n2   3") is None
+    assert check("1 2\n", "1 2 3\n") is not None
+    assert check("1 2 3\n", "1 2\n") is not None
+
+
+def test_case():
+    assert check("Yes\n", "yes\n") is not None
+    assert check("Yes\n", "yes\n", case_sensitive=False) is None
+
+
+def test_float_tolerance():
+    assert check("1.0\n", "1.000001\n") is not None
+    assert check("1.0\n", "1.000001\n", float_absolute_tolerance=1e-5) is None
+    assert check("1000.0\n", "1000.01\n", float_relative_tolerance=1e-4) is None
+    assert check("1000.0\n", "1000.2\n", float_relative_tolerance=1e-4) is not None
+    assert check("1.0\n", "one\n", float_absolute_tolerance=1e-5) is not None
+    assert check("one\n", "one\n", float_absolute_tolerance=1e-5) is None
+
+
+def test_debug_filter():
+    debug_filter = DebugFilter()
+    lines = ["1\n", "dbg: x = 3\n", "debug\n", "debugger\n", "debug_count=2\n"]
+
+    assert list(debug_filter.filter(lines)) == ["1\n", "debugger\n", "debug_count=2\n"]
+    assert debug_filter.debug_lines == 2
+
+    # Inline messages are output, unless asked otherwise
+    assert list(DebugFilter().filter(["2 (debug y)\n"])) == ["2 (debug y)\n"]
+
+
+def test_inline_debug_filter():
+    debug_filter = DebugFilter(inline=True)
+    lines = ["2 (debug y)\n", "3 (dbg)\n", "(debugger)\n"]
+
+    assert list(debug_filter.filter(lines)) == ["2\n", "3\n", "(debugger)\n"]
+    assert debug_filter.debug_lines == 2
@@ -0,0 +1,34 @@
+from nekontrol import compare
+
+
+def test_equal():
+    assert compare.diff("1\n2\n3\n", "1 \n2\n3") is None
+    assert compare.diff("", "") is None
+
+
+def test_diff():
+    diff = compare.diff("1\n2\n3\n", "1\n5\n3\n")
+    assert diff is not None
+    assert "- " in diff and "+ " in diff
+
+
+def test_missing_lines():
+    assert compare.diff("1\n2\n", "1\n") is not None
+    assert compare.diff("1\n", "1\n2\n") is not None
+
+
+def test_window_is_bounded():
+    n = 100_000
+    expected = "".join(f"{i}\n" for i in range(n))
+    actual = "".join(f"{i if i % 1000 else -i}\n" for i in range(n))
+
+    diff = compare.diff(expected, actual, context=2, max_lines=10)
+    assert diff is not None
+    assert len(diff.splitlines()) < 30
+    assert "rest of the output not shown" in diff
+
+
+def test_streams():
+    expected = iter(["1\n", "2\n"])
+    actual = iter(["1\n", "2\n"])
+    assert compare.diff(expected, actual) is None
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from os import path
+
+SRC = path.join(path.dirname(path.dirname(path.abspath(__file__))), "src")
+
+# Milliseconds that importing the CLI may take, it takes about 60 ms on a
+# laptop. nk is run by editors and scripts, so startup must stay fast
+IMPORT_BUDGET_MS = 200
+
+# Dependencies that only some commands need, and that are slow to import
+HEAVY_MODULES = ["requests", "urllib3", "lxml", "natsort", "rich.prompt"]
+
+
+def _python(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=dict(os.environ, PYTHONPATH=SRC),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def _cumulative_ms(importtime: str, module: str) -> float:
+    # Lines are "import time: <self us> | <cumulative us> | <module>"
+    for line in importtime.splitlines():
+        _, cumulative, name = line.split("|")
+        if name.strip() == module:
+            return int(cumulative) / 1000
+    raise AssertionError(f"{module} was not imported")
+
+
+def test_cli_import_budget():
+    # The best of a few runs, to not fail because of a busy machine
+    ms = min(
+        _cumulative_ms(
+            _python("import nekontrol.interactive.cli").stderr,
+            "nekontrol.interactive.cli",
+        )
+        for _ in range(3)
+    )
+    assert ms < IMPORT_BUDGET_MS
+
+
+def test_test_command_imports():
+    # What nk test imports before it needs to download anything
+    r = _python(
+        "import sys\n"
+        "import nekontrol.interactive.cli\n"
+        "import nekontrol.interactive.commands.test\n"
+        f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    assert r.stdout.split() == []
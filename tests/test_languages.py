@@ -1,18 +1,25 @@
+import os
 import shutil
+import sys
 from os import path
 
 import pytest
+from click import ClickException
 
 from nekontrol.config import Config
 from nekontrol.language import (
     Cpp,
+    FileInput,
     Haskell,
     JSNode,
     Language,
+    LimitExceeded,
+    Limits,
     Lua,
     Python,
     RunResult,
     Rust,
+    generic_run,
 )
 
 problems_dir = path.join(path.dirname(__file__), "problems")
@@ -53,6 +60,42 @@ def test_python():
     language_test(Python(path.join(problems_dir, "test.py"), cfg))
 
 
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_python_warm():
+    check_available("Python", Python.bins)
+    language_test(Python(path.join(problems_dir, "test.py"), Config(warm_workers=True)))
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_python_warm_replaces_dead_servers(tmp_path):
+    check_available("Python", Python.bins)
+    source = tmp_path / "big.py"
+    source.write_text(
+        "import os, sys\n"
+        "if sys.stdin.read() == 'kill':\n"
+        "    os.kill(os.getppid(), 9)\n"
+        "x = bytearray(64 * 1024 * 1024)\n"
+        "print(len(x))\n"
+    )
+
+    lang = Python(str(source), Config(warm_workers=True))
+    with lang as runnable:
+        assert lang.warm_pool is not None
+        for server in lang.warm_pool._all:
+            server.wait_ready()
+            server.p.kill()
+            server.p.wait()
+
+        # Kills the server during the run
+        with pytest.raises(ClickException):
+            runnable.run("kill")
+        res = runnable.run("")
+
+    assert res.exit == 0
+    assert res.max_rss is not None and res.max_rss >= 64 * 1024 * 1024
+    assert not res.max_rss_upper_bound
+
+
 def test_haskell():
     check_available("Haskell", ["ghc"])
     language_test(Haskell(path.join(problems_dir, "test.hs"), cfg))
@@ -71,3 +114,77 @@ def test_lua():
 def test_node():
     check_available("Node", JSNode.bins)
     language_test(JSNode(path.join(problems_dir, "test.js"), cfg))
+
+
+def test_resource_usage():
+    check_available("Python", Python.bins)
+    with Python(path.join(problems_dir, "test.py"), cfg) as runnable:
+        with open(ins_and_outs[0][0]) as input:
+            res = runnable.run(input.read())
+
+    assert res.wall_time is not None and res.wall_time > 0
+    if hasattr(os, "wait4"):
+        assert res.cpu_time is not None and res.cpu_time >= 0
+        assert res.max_rss is not None and res.max_rss > 0
+
+
+def test_wall_time_limit():
+    res = generic_run(
+        [sys.executable, "-c", "while True: pass"], "", Limits(wall_time=0.2)
+    )
+    assert res.limit_exceeded == LimitExceeded.TIME
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs resource usage")
+def test_fractional_cpu_limit():
+    res = generic_run(
+        [sys.executable, "-c", "import time\nwhile time.process_time() < 0.5: pass"],
+        "",
+        Limits(cpu_time=0.3),
+    )
+    assert res.exit == 0
+    assert res.limit_exceeded == LimitExceeded.TIME
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="needs resource limits")
+def test_memory_limit():
+    res = generic_run(
+        [sys.executable, "-c", "x = bytearray(2 * 1024**3)"],
+        "",
+        Limits(memory=512 * 1024 * 1024),
+    )
+    assert res.limit_exceeded == LimitExceeded.MEMORY
+
+
+def test_file_input():
+    check_available("Python", Python.bins)
+    with Python(path.join(problems_dir, "test.py"), cfg) as runnable:
+        for ifile, ofile in ins_and_outs:
+            res = runnable.run(FileInput(ifile))
+            try:
+                assert res.stdout_path is not None
+                with open(ofile) as output:
+                    assert res.read_stdout() == output.read()
+            finally:
+                res.cleanup()
+
+            assert not path.exists(res.stdout_path)
+
+
+def test_extra_flags():
+    config = Config(extra_flags={"C++": ["-g"], "Rust": ["-C", "debuginfo=2"]})
+    cpp = Cpp("a.cpp", config)
+    cpp.compiled_output = "a.out"
+
+    assert cpp.compile_cmdline == cpp.cmdline + ["-g"]
+
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity"), reason="needs CPU affinity")
+def test_pin_cpu():
+    cpu = min(os.sched_getaffinity(0))
+    res = generic_run(
+        [sys.executable, "-c", "import os; print(os.sched_getaffinity(0))"],
+        "",
+        Limits(cpu=cpu),
+    )
+    assert res.stdout.strip() == str({cpu})
@@ -0,0 +1,16 @@
+from nekontrol.interactive.commands.prefetch import problem_ids
+
+
+def test_problem_ids(tmp_path):
+    solutions = tmp_path / "solutions"
+    solutions.mkdir()
+    (solutions / "hello.py").write_text("")
+    (solutions / "hello.cpp").write_text("")
+    (solutions / "notes.txt").write_text("")
+
+    problem_list = tmp_path / "problems.txt"
+    problem_list.write_text("ovissa\n\n# comment\ncarrots  # trailing\n")
+
+    ids = problem_ids([str(solutions), str(problem_list), "different"])
+
+    assert ids == ["hello", "ovissa", "carrots", "different"]
@@ -0,0 +1,112 @@
+from os import path
+
+import pytest
+from click import ClickException
+
+from nekontrol import problems
+from nekontrol.config import Config
+from nekontrol.interactive.commands import profile
+from nekontrol.language import Python
+from nekontrol.profiler import (
+    PythonProfiler,
+    parse_cpu_profile,
+    parse_ghc_profile,
+    parse_perf_report,
+)
+
+PERF_REPORT = """\
+# Samples: 1K of event 'cycles:u'
+#
+# Overhead  Symbol
+# ........  ..............................
+#
+    71.20%  [.] solve(int)
+    20.05%  [.] main
+     8.75%  [k] 0xffffffff8b200b60
+"""
+
+GHC_PROFILE = """\
+\tTue Oct 17 12:00 2026 Time and Allocation Profiling Report  (Final)
+
+COST CENTRE MODULE SRC                    %time %alloc
+
+solve       Main   Main.hs:(5,1)-(7,30)    80.0   60.1
+main        Main   Main.hs:10:1-30         20.0   39.9
+
+
+                                                    individual     inherited
+COST CENTRE MODULE SRC                no.  entries  %time %alloc   %time %alloc
+"""
+
+
+def test_parse_perf_report():
+    hotspots = parse_perf_report(PERF_REPORT)
+
+    assert [h.name for h in hotspots] == ["solve(int)", "main", "0xffffffff8b200b60"]
+    assert hotspots[0].self_fraction == pytest.approx(0.712)
+
+
+def test_parse_ghc_profile():
+    [solve, main] = parse_ghc_profile(GHC_PROFILE)
+
+    assert solve.name == "Main.solve"
+    assert solve.self_fraction == pytest.approx(0.8)
+    assert solve.location == "Main.hs:(5,1)-(7,30)"
+    assert main.name == "Main.main"
+
+
+def test_parse_cpu_profile():
+    def node(id, name, line):
+        return {
+            "id": id,
+            "callFrame": {
+                "functionName": name,
+                "url": "file:///a.js",
+                "lineNumber": line,
+            },
+        }
+
+    profile = {
+        "nodes": [node(1, "(idle)", -1), node(2, "fib", 1), node(3, "", 5)],
+        "samples": [1, 2, 2, 2, 3],
+    }
+    [fib, anonymous] = parse_cpu_profile(profile)
+
+    assert (fib.name, fib.location) == ("fib", "a.js:2")
+    assert fib.self_fraction == pytest.approx(0.6)
+    assert anonymous.name == "(anonymous)"
+
+
+def test_python_profiler(tmp_path):
+    source = tmp_path / "sol.py"
+    source.write_text(
+        "def slow(n):\n"
+        "    return sum(i * i for i in range(n))\n"
+        "\n"
+        "print(slow(int(input())))\n"
+    )
+
+    profile = PythonProfiler().profile(Python(str(source), Config()), "300000\n")
+
+    assert profile.result.stdout == f"{sum(i * i for i in range(300000))}\n"
+    names = [h.name for h in profile.hotspots]
+    assert "slow" in names
+    assert any(h.location == f"{path.basename(source)}:1" for h in profile.hotspots)
+
+
+def test_profile_problem(tmp_path, monkeypatch):
+    source = tmp_path / "a.py"
+    source.write_text("print(1)\n")
+
+    fetched = []
+
+    def problem_samples(problem, source_dir, config, tctx=None, sources=None):
+        fetched.append((problem, [src.source_name for src in sources]))
+        return []
+
+    monkeypatch.setattr(problems, "problem_samples", problem_samples)
+
+    with pytest.raises(ClickException):
+        profile.profile(str(source), "hello", None, 10, Config())
+
+    assert fetched == [("a", ["Local samples"]), ("hello", ["Kattis"])]
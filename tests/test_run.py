@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+import pytest
+
+from nekontrol.config import Config
+from nekontrol.interactive.commands import run
+from nekontrol.language import Runnable, RunResult
+from nekontrol.problems.sample import ProblemSample
+
+
+def test_repeat():
+    wall_times = iter([0.5, 0.1, 0.2, 0.4, 0.3])
+
+    def run_sample(input, args):
+        return RunResult(
+            exit=0,
+            stdout=input,
+            stderr="",
+            wall_time=next(wall_times),
+            user_time=0.1,
+            sys_time=0.0,
+        )
+
+    sample = ProblemSample(name="1.in", source="Local", input="1\n", output="1\n")
+    config = Config(repeat=3, warmup=2)
+    execution = run.execute(Runnable(run_sample), sample, config)
+
+    # The warmup runs are not timed, and the first timed run is checked
+    assert execution.wall_times == [0.2, 0.4, 0.3]
+    assert execution.cpu_times == [0.1, 0.1, 0.1]
+    assert execution.duration == pytest.approx(0.3)
+    assert execution.result.wall_time == 0.2
+
+
+def test_timing_stats_msg():
+    assert run.timing_stats_msg("wall", [0.1, 0.2, 0.6]) == (
+        "wall min 0.1 s, median 0.2 s, mean 0.3 s, stdev 0.26 s"
+    )
+
+
+def test_unreported_results_are_cleaned_up(tmp_path, monkeypatch):
+    def run_sample(input, args):
+        fd, stdout_path = tempfile.mkstemp(dir=tmp_path)
+        os.close(fd)
+        return RunResult(exit=0, stdout="", stderr="", stdout_path=stdout_path)
+
+    def failing_report(execution, config, c):
+        raise KeyboardInterrupt()
+
+    monkeypatch.setattr(run, "_report", failing_report)
+
+    samples = [
+        ProblemSample(name=f"{i}.in", source="Local", input="1\n", output="1\n")
+        for i in range(4)
+    ]
+    with pytest.raises(KeyboardInterrupt):
+        run.run_each_sample(Runnable(run_sample), samples, Config(jobs=2))
+
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,96 @@
+import time
+
+import pytest
+
+from nekontrol.config import Config
+from nekontrol.problems.cache import CacheEntry, SampleStore
+from nekontrol.problems.sample import ProblemSample
+from nekontrol.problems.source import CachedProblemSource, Fetched
+
+sample = ProblemSample(name="1.in", source="Fake", input="1\n", output="2\n")
+
+
+class FakeSource(CachedProblemSource):
+    source_name = "Fake"
+
+    def __init__(self, result: Fetched | Exception):
+        self.result = result
+        self.requests: list[tuple[str | None, str | None]] = []
+
+    def fetch(self, problem, source_dir, cfg, etag=None, last_modified=None, tctx=None):
+        self.requests.append((etag, last_modified))
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def test_cached():
+    cfg = Config()
+    src = FakeSource(Fetched(samples=[sample], etag="a"))
+
+    assert src.find_problem("p", "", cfg) == [sample]
+    assert src.find_problem("p", "", cfg) == [sample]
+    assert len(src.requests) == 1
+    assert src.is_fresh("p", cfg)
+
+
+def test_revalidate():
+    src = FakeSource(Fetched(samples=[sample], etag="a", last_modified="b"))
+    src.find_problem("p", "", Config())
+
+    src.result = Fetched(samples=None, not_modified=True)
+    assert src.find_problem("p", "", Config(sample_cache_ttl=0)) == [sample]
+    assert src.requests[-1] == ("a", "b")
+
+
+def test_failure_is_cached_briefly():
+    src = FakeSource(Fetched(samples=None))
+
+    assert src.find_problem("p", "", Config()) == []
+    assert src.find_problem("p", "", Config()) == []
+    assert len(src.requests) == 1
+
+    src.result = Fetched(samples=[sample])
+    assert src.find_problem("p", "", Config(sample_cache_failure_ttl=0)) == [sample]
+
+
+def test_stale_on_error(monkeypatch):
+    src = FakeSource(Fetched(samples=[sample]))
+    src.find_problem("p", "", Config())
+
+    src.result = ConnectionError()
+    assert src.find_problem("p", "", Config(sample_cache_ttl=0)) == [sample]
+    # The failure is remembered like when there are no stale samples
+    assert src.find_problem("p", "", Config(sample_cache_ttl=0)) == [sample]
+    assert len(src.requests) == 2
+
+    # And fetching is tried again once it expires
+    later = time.time() + Config().sample_cache_failure_ttl + 1
+    monkeypatch.setattr(time, "time", lambda: later)
+    assert src.find_problem("p", "", Config(sample_cache_ttl=0)) == [sample]
+    assert len(src.requests) == 3
+
+    with pytest.raises(ConnectionError):
+        src.find_problem("q", "", Config())
+
+
+def test_error_is_cached_briefly():
+    src = FakeSource(ConnectionError())
+
+    with pytest.raises(ConnectionError):
+        src.find_problem("p", "", Config())
+    assert src.find_problem("p", "", Config()) == []
+    assert len(src.requests) == 1
+
+    src.result = Fetched(samples=[sample])
+    assert src.find_problem("p", "", Config(sample_cache_failure_ttl=0)) == [sample]
+
+
+def test_eviction(tmp_path):
+    store = SampleStore(str(tmp_path / "samples.sqlite3"), max_size=1)
+
+    store.put("Fake", "p", CacheEntry(samples=[sample], fetched_at=time.time()))
+    store.put("Fake", "q", CacheEntry(samples=None, fetched_at=time.time()))
+
+    assert store.get("Fake", "p") is None
+    assert store.get("Fake", "q") is not None
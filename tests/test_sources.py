@@ -1,8 +1,16 @@
+import io
+import os
+import threading
+import time
+import zipfile
 from os import path
 
 from nekontrol.config import Config
+from nekontrol.problems import fetch_problem_samples, problem_samples
 from nekontrol.problems.sample import ProblemSample
-from nekontrol.problems.sources.kattis import KattisSource
+from nekontrol.problems.source import ProblemSource
+from nekontrol.problems.sources import local
+from nekontrol.problems.sources.kattis import KattisSource, samples_from_zip
 from nekontrol.problems.sources.local import LocalSource
 
 
@@ -31,6 +39,97 @@ def test_local():
     assert len(samples) == 3
 
 
+def test_local_samples_are_read_lazily(tmp_path):
+    (tmp_path / "a.in").write_text("1 2\n")
+    (tmp_path / "a.ans").write_text("3\n")
+
+    [sample] = LocalSource().find_problem("a", source_dir=str(tmp_path), cfg=Config())
+    assert sample.input_path == str(tmp_path / "a.in")
+    assert sample.size == 4
+
+    # The data is read when used, so changes to the files show up
+    (tmp_path / "a.ans").write_text("4\n")
+    assert sample.output == "4\n"
+    assert sample == ProblemSample(
+        name="a.in", source="Local", input="1 2\n", output="4\n"
+    )
+
+
+def test_local_recursive(tmp_path):
+    for file, data in [
+        ("a.in", "1\n"),
+        ("a.ans", "2\n"),
+        ("a/data/sample/1.in", "3\n"),
+        ("a/data/sample/1.ans", "4\n"),
+        ("a/data/secret/big.in", "5\n"),
+        ("data/1.in", "6\n"),
+    ]:
+        (tmp_path / file).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file).write_text(data)
+
+    def find():
+        return LocalSource().find_problem("a", source_dir=str(tmp_path), cfg=Config())
+
+    assert find() == [
+        ProblemSample(name="a.in", source="Local", input="1\n", output="2\n"),
+        ProblemSample(
+            name=path.join("a", "data", "sample", "1.in"),
+            source="Local",
+            input="3\n",
+            output="4\n",
+        ),
+        ProblemSample(
+            name=path.join("a", "data", "secret", "big.in"),
+            source="Local",
+            input="5\n",
+        ),
+    ]
+
+    (tmp_path / "a" / "data" / "secret" / "big.ans").write_text("6\n")
+    assert find()[2].output == "6\n"
+
+    (tmp_path / "a" / "data" / "sample" / "1.in").unlink()
+    assert len(find()) == 2
+
+    cfg = Config(sample_patterns=["data/*.in"])
+    [sample] = LocalSource().find_problem("a", source_dir=str(tmp_path), cfg=cfg)
+    assert sample.input == "6\n"
+
+
+def test_local_index(tmp_path, monkeypatch):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "1.in").write_text("1\n")
+
+    scans = []
+    scan = local._scan
+
+    def counting_scan(*args):
+        scans.append(1)
+        return scan(*args)
+
+    monkeypatch.setattr(local, "_scan", counting_scan)
+
+    def find():
+        return LocalSource().find_problem("a", source_dir=str(tmp_path), cfg=Config())
+
+    # Directories that were just modified may change again within the same
+    # modification time, so they are scanned every time
+    assert len(find()) == 1
+    assert len(find()) == 1
+    assert len(scans) == 2
+
+    for dir in [tmp_path, tmp_path / "a"]:
+        os.utime(dir, (0, 0))
+    find()
+    find()
+    assert len(scans) == 3
+
+    # Until a directory changes
+    (tmp_path / "a" / "2.in").write_text("2\n")
+    assert len(find()) == 2
+    assert len(scans) == 4
+
+
 def test_kattis():
     samples = KattisSource().find_uncached("ovissa", "", cfg=Config())
 
@@ -47,3 +146,92 @@ def test_kattis():
     )
 
     assert len(samples) == 2
+
+
+def test_zip():
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zip:
+        zip.writestr("1.in", "1\r\n")
+        zip.writestr("1.ans", "2\n")
+        zip.writestr("2.in", "3\n")
+        zip.writestr("notes.txt", "")
+        zip.writestr("secret/1.in", "4\n")
+
+    with zipfile.ZipFile(buf) as zip:
+        samples = samples_from_zip(zip, "Kattis")
+
+    assert sorted(samples, key=lambda s: s.name) == [
+        ProblemSample(name="1.in", source="Kattis", input="1\n", output="2\n"),
+        ProblemSample(name="2.in", source="Kattis", input="3\n", output=None),
+        ProblemSample(name="secret/1.in", source="Kattis", input="4\n", output=None),
+    ]
+
+
+class SlowSource(ProblemSource):
+    source_name = "Slow"
+
+    def find_problem(self, problem, source_dir, cfg, tctx=None):
+        time.sleep(2)
+        return []
+
+
+def test_fetch_timeout():
+    started = time.monotonic()
+    samples = problem_samples(
+        "test",
+        path.join(path.dirname(__file__), "problems"),
+        Config(fetch_timeout=0.2),
+        sources=[LocalSource(), SlowSource()],
+    )
+
+    assert len(samples) == 3
+    assert time.monotonic() - started < 1
+
+
+class StuckSource(ProblemSource):
+    source_name = "Stuck"
+
+    def find_problem(self, problem, source_dir, cfg, tctx=None):
+        self.thread = threading.current_thread()
+        threading.Event().wait()
+
+
+def test_fetch_timeout_exits():
+    stuck = StuckSource()
+    problem_samples("test", "", Config(fetch_timeout=0.1), sources=[stuck])
+
+    # A source that never finishes doesn't keep the process from exiting
+    assert stuck.thread.daemon
+
+
+class QuickSource(ProblemSource):
+    source_name = "Quick"
+
+    def find_problem(self, problem, source_dir, cfg, tctx=None):
+        time.sleep(0.1)
+        return [ProblemSample(name="quick.in", source="Quick", input="1\n")]
+
+
+def test_fetch_timeout_excludes_running():
+    fetched = fetch_problem_samples(
+        "test",
+        path.join(path.dirname(__file__), "problems"),
+        Config(fetch_timeout=0.5),
+        sources=[LocalSource(), QuickSource()],
+    )
+
+    names = []
+    for samples in fetched:
+        names += [sample.name for sample in samples]
+        # Running the first samples takes longer than the timeout
+        time.sleep(0.8)
+
+    assert "quick.in" in names
+
+
+def test_session_returns_failed_responses():
+    from nekontrol.http_session import session
+
+    # Running out of retries gives the last response instead of raising
+    retry = session().get_adapter("https://open.kattis.com").max_retries
+    assert not retry.raise_on_status
@@ -0,0 +1,49 @@
+from nekontrol.config import Config
+from nekontrol.interactive.commands.stress import (
+    Mismatch,
+    Stress,
+    save_case,
+    worker_count,
+)
+from nekontrol.language import Runnable, RunResult
+
+
+def program(f) -> Runnable:
+    return Runnable(lambda input, args: RunResult(0, f(input, args), ""))
+
+
+generator = program(lambda input, args: f"{int(args[0]) % 10}\n")
+reference = program(lambda input, args: f"{int(input) * 2}\n")
+
+
+def test_stress_finds_mismatch():
+    # Wrong for inputs of 7
+    solution = program(
+        lambda input, args: "15\n" if input == "7\n" else f"{int(input) * 2}\n"
+    )
+    stress = Stress(solution, generator, reference, Config())
+
+    assert stress.search(0, None, workers=4, task=None) == Mismatch(7, "7\n", "14\n")
+
+
+def test_stress_count():
+    solution = program(lambda input, args: f"{int(input) * 2}\n")
+    stress = Stress(solution, generator, reference, Config())
+
+    assert stress.search(0, 100, workers=4, task=None) is None
+    assert stress.cases == 100
+
+
+def test_save_case(tmp_path):
+    file_path = str(tmp_path / "sol.py")
+    mismatch = Mismatch(1, "1\n", "2\n")
+
+    assert save_case(file_path, mismatch) == str(tmp_path / "sol.stress1.in")
+    assert save_case(file_path, mismatch) == str(tmp_path / "sol.stress2.in")
+    assert (tmp_path / "sol.stress2.ans").read_text() == "2\n"
+
+
+def test_worker_count():
+    assert worker_count(Config(jobs=2)) == 2
+    assert worker_count(Config(pin_cpu=0)) == 1
+    assert worker_count(Config(precise_timing=True)) == 1
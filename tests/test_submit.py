@@ -0,0 +1,107 @@
+import io
+import os
+import stat
+
+import pytest
+import requests
+from rich.console import Console
+
+from nekontrol.config import Config
+from nekontrol.console import setup_console
+from nekontrol.interactive.commands import submit
+from nekontrol.interactive.tasks import TaskContext
+
+
+def test_stored_cookies(cache_dir):
+    session = requests.Session()
+    session.cookies.set("EduSiteCookie", "secret", domain="open.kattis.com")
+    session.cookies.set("other", "value", domain="example.com")
+    submit._store_cookies(session, "user", "token")
+
+    [stored] = [f for f in os.listdir(cache_dir) if f.startswith("kattis-")]
+    assert stat.S_IMODE(os.stat(cache_dir / stored).st_mode) == 0o600
+
+    session = requests.Session()
+    assert submit._load_cookies(session, "user", "token")
+    assert session.cookies.get("EduSiteCookie") == "secret"
+    assert session.cookies.get("other") is None
+
+    # A new token needs a new login
+    assert not submit._load_cookies(requests.Session(), "user", "new token")
+
+
+def test_poll_interval():
+    queued = submit.PollStatusPreparing("Waiting for run", queued=True)
+    intervals = [0.0]
+    for _ in range(10):
+        intervals.append(submit.next_poll_interval(queued, intervals[-1]))
+
+    # Backs off while queued
+    assert intervals[1:] == sorted(intervals[1:])
+    assert intervals[1] < intervals[-1] <= 3.0
+
+    # But is fast again once running
+    running = submit.PollStatusRunning(total_test_cases=3, successful_test_cases=1)
+    assert submit.next_poll_interval(running, intervals[-1]) < intervals[1]
+
+
+def test_live_poll_submissions(monkeypatch):
+    statuses = {
+        "1": [
+            submit.PollStatusPreparing("Compiling"),
+            submit.PollStatusRunning(total_test_cases=2, successful_test_cases=1),
+            submit.PollStatusAccepted(total_test_cases=2),
+        ],
+        "2": [submit.PollStatusPrepareErr("Compile Error")],
+    }
+    monkeypatch.setattr(submit, "poll", lambda id, kattis: statuses[id].pop(0))
+
+    judged = submit.live_poll_submissions({"1": "a", "2": "b"}, kattis=None)
+
+    assert judged == {
+        "1": submit.PollStatusAccepted(total_test_cases=2),
+        "2": submit.PollStatusPrepareErr("Compile Error"),
+    }
+
+
+def test_failed_submission_tracks_others(monkeypatch, tmp_path, capsys):
+    files = [str(tmp_path / name) for name in ["a.py", "b.py", "c.py"]]
+    for file in files:
+        open(file, "w").close()
+
+    def submit_solution(solution, kattis):
+        if solution.problem == "b":
+            raise requests.ConnectionError("offline")
+        return solution.problem
+
+    tracked = []
+    monkeypatch.setattr(submit, "_submit_solution", submit_solution)
+    monkeypatch.setattr(
+        submit.KattisSession, "from_config", staticmethod(lambda config: None)
+    )
+    monkeypatch.setattr(
+        submit,
+        "live_poll_submissions",
+        lambda submissions, kattis, tctx=None: tracked.append(submissions),
+    )
+
+    setup_console()
+    with pytest.raises(SystemExit):
+        submit.submit(files, None, Config(force=True), yes=True)
+
+    assert tracked == [{"a": "a", "c": "c"}]
+    assert "offline" in capsys.readouterr().out
+
+
+def test_pre_test_error_fails_solution(monkeypatch):
+    def test_solution(file_path, problem, config, tctx, c):
+        raise FileNotFoundError("python3")
+
+    monkeypatch.setattr(submit.test, "test_solution", test_solution)
+
+    out = io.StringIO()
+    solution = submit.Solution(file_path="a.py", problem="a", lang=None)
+    with TaskContext(console=Console(file=out)) as tctx:
+        assert not submit._pre_test(solution, Config(), tctx)
+
+    assert "FileNotFoundError: python3" in out.getvalue()
@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+from os import path
+
+import pytest
+
+from nekontrol.config import Config
+from nekontrol.language import Python, RunResult
+from nekontrol.problems.sample import ProblemSample
+from nekontrol.validator import OutputValidator
+
+problems_dir = path.join(path.dirname(__file__), "problems")
+
+
+@pytest.fixture
+def validator():
+    if not any(shutil.which(b) for b in Python.bins):
+        pytest.skip("no binary for Python is available")
+
+    with Python(path.join(problems_dir, "validator.py"), Config()) as runnable:
+        yield OutputValidator(runnable)
+
+
+sample = ProblemSample(name="1.in", source="Local", input="1\n", output="2\n")
+
+
+def test_accepted(validator: OutputValidator):
+    result = RunResult(exit=0, stdout="debug x\n2\n", stderr="")
+    validation = validator.validate(sample, result)
+
+    assert validation.accepted
+    assert validation.debug_lines == 1
+
+
+def test_wrong_answer(validator: OutputValidator):
+    result = RunResult(exit=0, stdout="3\n", stderr="")
+    validation = validator.validate(sample, result)
+
+    assert not validation.accepted
+    assert validation.feedback == "expected 2"
+
+
+def test_files(validator: OutputValidator, tmp_path):
+    file_sample = ProblemSample(
+        name="test.in",
+        source="Local",
+        input="1\n",
+        output="2\n",
+        input_path=path.join(problems_dir, "test.in"),
+        output_path=path.join(problems_dir, "test.ans"),
+    )
+    stdout_path = tmp_path / "stdout"
+    stdout_path.write_text("2\n")
+    result = RunResult(exit=0, stdout="", stderr="", stdout_path=str(stdout_path))
+
+    assert validator.validate(file_sample, result).accepted
+
+
+def test_no_files_left(validator: OutputValidator, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+
+    result = RunResult(exit=0, stdout="debug x\n2\n", stderr="")
+    assert validator.validate(sample, result).accepted
+
+    assert list(tmp_path.iterdir()) == []
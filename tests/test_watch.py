@@ -0,0 +1,92 @@
+import os
+import threading
+
+import click
+import pytest
+
+from nekontrol import watcher
+from nekontrol.config import Config
+from nekontrol.interactive.commands.watch import PreparedLanguage
+from nekontrol.interactive.tasks import TaskContext
+from nekontrol.language import Language, Runnable, RunResult
+from nekontrol.watcher import Watcher
+
+
+@pytest.fixture(params=["inotify", "polling"])
+def backend(request, monkeypatch):
+    if request.param == "polling":
+        monkeypatch.setattr(watcher, "_libc", lambda: None)
+        monkeypatch.setattr(watcher, "POLL_INTERVAL", 0.01)
+    elif watcher._libc() is None:
+        pytest.skip("inotify is not available")
+    return request.param
+
+
+def wait_for(w: Watcher, change) -> set[str]:
+    """Wait for changes made by a thread while the watcher is waiting."""
+    timer = threading.Timer(0.1, change)
+    timer.start()
+    try:
+        return w.wait()
+    finally:
+        timer.join()
+
+
+def test_watcher_write(tmp_path, backend):
+    file = tmp_path / "a.py"
+    file.write_text("1")
+
+    with Watcher([(str(tmp_path), False)]) as w:
+        assert (w._fd is not None) == (backend == "inotify")
+        changed = wait_for(w, lambda: file.write_text("22"))
+
+    assert str(file) in changed
+
+
+def test_watcher_rename(tmp_path, backend):
+    (tmp_path / "data").mkdir()
+    tmp = tmp_path / "data" / "1.in.tmp"
+    tmp.write_text("1")
+
+    with Watcher([(str(tmp_path), True)]) as w:
+        changed = wait_for(w, lambda: os.rename(tmp, tmp_path / "data" / "1.in"))
+
+    assert str(tmp_path / "data" / "1.in") in changed
+
+
+class Counting(Language):
+    kattis_name = "Counting"
+    prepares = 0
+    fail = False
+
+    def prepare(self) -> Runnable:
+        Counting.prepares += 1
+        if Counting.fail:
+            raise click.ClickException("Compilation failed")
+        return Runnable(lambda input, args: RunResult(0, input, ""))
+
+
+def test_prepared_language(tmp_path):
+    source = tmp_path / "a.count"
+    source.write_text("1")
+    Counting.prepares = 0
+    prepared = PreparedLanguage(Counting(str(source), Config()))
+
+    with TaskContext() as tctx:
+        runnable = prepared.prepare(tctx)
+        assert prepared.prepare(tctx) is runnable
+        assert Counting.prepares == 1
+
+        source.write_text("2")
+        Counting.fail = True
+        try:
+            with pytest.raises(click.ClickException):
+                prepared.prepare(tctx)
+            assert prepared.runnable is None
+
+            # A failed prepare is tried again, even if the source is unchanged
+            Counting.fail = False
+            prepared.prepare(tctx)
+            assert Counting.prepares == 3
+        finally:
+            Counting.fail = False